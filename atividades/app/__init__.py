@@ -1,16 +1,27 @@
 from flask import Flask
 from flasgger import Swagger
-from app.database import db
+from app.database import criar_indices, db
+from app import admissao, arquivo, atualizacao, dados_sinteticos, fila, formato, limpeza, lote, rastreamento  # arquivo, atualizacao, limpeza e lote registram rotas no blueprint
 from app.routes import atividades_bp
 
 def create_app():
     app = Flask(__name__)
     app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///atividades.db'
+    app.config['SQLALCHEMY_BINDS'] = {'arquivo': 'sqlite:///atividades_arquivo.db'}
     app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
     db.init_app(app)
     Swagger(app)
+    formato.instalar(app)
+    rastreamento.instalar(app, 'atividades')
+    admissao.instalar(app, atividades_bp)
+    fila.instalar(app)
     app.register_blueprint(atividades_bp)
+    arquivo.registrar_comando(app)
+    dados_sinteticos.registrar_comando(app)
+    fila.registrar_comando(app)
 
     with app.app_context():
         db.create_all()
+        arquivo.preparar_ids()
+        criar_indices()
     return app
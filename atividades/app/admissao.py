@@ -0,0 +1,126 @@
+import os
+import threading
+import time
+
+from flask import g, jsonify, request
+
+ADMISSAO_LIMITE = int(os.getenv('ADMISSAO_LIMITE', '16'))  # 0 desliga o controle
+ADMISSAO_FILA = int(os.getenv('ADMISSAO_FILA', '64'))
+ADMISSAO_ESPERA = float(os.getenv('ADMISSAO_ESPERA', '2'))
+ADMISSAO_RETRY_AFTER = os.getenv('ADMISSAO_RETRY_AFTER', '1')
+
+LEITURA = 'leitura'
+ESCRITA = 'escrita'
+METODOS_LEITURA = ('GET', 'HEAD', 'OPTIONS')
+
+
+class ControleAdmissao:
+    """Limita as requisições simultâneas, com uma fila de espera limitada.
+
+    Quando há leituras esperando, elas são admitidas antes das escritas. Requisições que
+    encontram a fila cheia, ou que esperam mais que `espera_maxima`, são rejeitadas.
+    """
+
+    def __init__(self, limite, fila_maxima, espera_maxima):
+        self.limite = limite
+        self.fila_maxima = fila_maxima
+        self.espera_maxima = espera_maxima
+        self._cond = threading.Condition()
+        self._ativas = 0
+        self._esperando = {LEITURA: 0, ESCRITA: 0}
+        self._admitidas = 0
+        self._rejeitadas = 0
+        self._espera_total = 0.0
+        self._espera_maxima_vista = 0.0
+
+    def _pode_entrar(self, prioridade):
+        if self._ativas >= self.limite:
+            return False
+        return prioridade == LEITURA or self._esperando[LEITURA] == 0
+
+    def entrar(self, prioridade):
+        """Ocupa uma vaga; devolve False se a requisição deve ser rejeitada."""
+        inicio = time.monotonic()
+        with self._cond:
+            if not self._pode_entrar(prioridade):
+                if sum(self._esperando.values()) >= self.fila_maxima:
+                    self._rejeitadas += 1
+                    return False
+                self._esperando[prioridade] += 1
+                try:
+                    admitida = self._cond.wait_for(lambda: self._pode_entrar(prioridade), self.espera_maxima)
+                finally:
+                    self._esperando[prioridade] -= 1
+                if not admitida:
+                    self._rejeitadas += 1
+                    # Uma escrita pode estar aguardando só por causa desta leitura
+                    self._cond.notify_all()
+                    return False
+            espera = time.monotonic() - inicio
+            self._ativas += 1
+            self._admitidas += 1
+            self._espera_total += espera
+            self._espera_maxima_vista = max(self._espera_maxima_vista, espera)
+            return True
+
+    def sair(self):
+        with self._cond:
+            self._ativas -= 1
+            self._cond.notify_all()
+
+    def metricas(self):
+        with self._cond:
+            return {
+                'limite': self.limite,
+                'fila_maxima': self.fila_maxima,
+                'ativas': self._ativas,
+                'fila': dict(self._esperando),
+                'admitidas': self._admitidas,
+                'rejeitadas': self._rejeitadas,
+                'espera_media_ms': round(self._espera_total / self._admitidas * 1000, 3) if self._admitidas else 0.0,
+                'espera_maxima_ms': round(self._espera_maxima_vista * 1000, 3),
+            }
+
+
+controle = ControleAdmissao(ADMISSAO_LIMITE, ADMISSAO_FILA, ADMISSAO_ESPERA)
+
+
+def acompanhar_resposta(resp):
+    """Mantém a vaga da requisição ocupada até o fim do envio de uma resposta em streaming."""
+    if g.pop('admitida', False):
+        resp.call_on_close(controle.sair)
+    return resp
+
+
+def instalar(app, bp):
+    """Aplica o controle de admissão às rotas do blueprint e expõe /metricas/admissao."""
+    @app.route('/metricas/admissao', methods=['GET'])
+    def metricas_admissao():
+        """
+        Métricas do controle de admissão
+        ---
+        tags: [Métricas]
+        responses:
+          200: { description: "Vagas ocupadas, fila de espera, rejeições e tempo de espera" }
+        """
+        return jsonify(controle.metricas())
+
+    if ADMISSAO_LIMITE <= 0:
+        return
+
+    @app.before_request
+    def admitir():
+        if request.blueprint != bp.name:
+            return None
+        prioridade = LEITURA if request.method in METODOS_LEITURA else ESCRITA
+        if not controle.entrar(prioridade):
+            resp = jsonify({'erro': 'Serviço sobrecarregado, tente novamente em instantes'})
+            resp.status_code = 503
+            resp.headers['Retry-After'] = ADMISSAO_RETRY_AFTER
+            return resp
+        g.admitida = True
+
+    @app.teardown_request
+    def liberar(exc):
+        if g.pop('admitida', False):
+            controle.sair()
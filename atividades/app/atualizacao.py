@@ -0,0 +1,293 @@
+"""Atualização parcial (PATCH /<entidade>/<id>) e em lote (PATCH /<entidade>).
+
+O lote agrupa os itens com as mesmas alterações e executa um único
+`UPDATE ... WHERE id IN (...)` por grupo. Os professores, turmas e alunos referenciados
+são conferidos no Gerenciamento em blocos (GET /<recurso>?ids=...), cada um uma única
+vez, por mais itens que o usem. Linhas que já têm os valores pedidos não são regravadas.
+"""
+import os
+from datetime import datetime
+
+from flask import jsonify, request
+from sqlalchemy import or_, select, update
+
+from app.formato import ler_resposta
+from app.models import db, Atividade, Nota
+from app.routes import atividades_bp as bp, to_dict
+from app.servicos import GERENCIAMENTO_URL, GerenciamentoIndisponivel, requer_gerenciamento, sessao
+
+ATUALIZACAO_MAX_ITENS = int(os.getenv('ATUALIZACAO_MAX_ITENS', '5000'))
+IDS_POR_COMANDO = 500
+
+
+class AlteracaoInvalida(Exception):
+    pass
+
+
+def _data(valor):
+    return datetime.fromisoformat(valor).date() if valor else None
+
+
+# Campos que podem ser alterados, com a conversão do valor recebido (None = usar como veio)
+CAMPOS = {
+    Atividade: {'nome_atividade': None, 'descricao': None, 'peso_projeto': None, 'data_entrega': _data,
+                'turma_id': None, 'professor_id': None},
+    Nota: {'nota': None, 'aluno_id': None, 'atividade_id': None},
+}
+NAO_ENCONTRADO = {Atividade: 'Atividade não encontrada', Nota: 'Nota não encontrada'}
+
+
+def _em_blocos(valores):
+    valores = list(valores)
+    for i in range(0, len(valores), IDS_POR_COMANDO):
+        yield valores[i:i + IDS_POR_COMANDO]
+
+
+def _inexistentes(model, ids):
+    encontrados = set()
+    for bloco in _em_blocos(ids):
+        encontrados.update(db.session.execute(select(model.id).where(model.id.in_(bloco))).scalars())
+    return sorted(set(ids) - encontrados)
+
+
+def _inexistentes_no_gerenciamento(recurso, ids):
+    """Confere os IDs com GET /<recurso>?ids=...&fields=id, um bloco de IDS_POR_COMANDO por chamada."""
+    validos = {i for i in ids if isinstance(i, int) and not isinstance(i, bool)}
+    encontrados = set()
+    for bloco in _em_blocos(sorted(validos)):
+        resp = sessao.get(f"{GERENCIAMENTO_URL}/{recurso}", params={'ids': ','.join(map(str, bloco)), 'fields': 'id'})
+        if resp.status_code != 200:
+            raise GerenciamentoIndisponivel(resp)
+        encontrados.update(item['id'] for item in ler_resposta(resp))
+    return sorted(validos - encontrados) + [i for i in ids if i not in validos]
+
+
+# Campo de chave estrangeira -> (função que devolve os IDs inexistentes, mensagem)
+REFERENCIAS = {
+    'professor_id': (lambda ids: _inexistentes_no_gerenciamento('professores', ids), 'Professor não encontrado'),
+    'turma_id': (lambda ids: _inexistentes_no_gerenciamento('turmas', ids), 'Turma não encontrada'),
+    'aluno_id': (lambda ids: _inexistentes_no_gerenciamento('alunos', ids), 'Aluno não encontrado'),
+    'atividade_id': (lambda ids: _inexistentes(Atividade, ids), 'Atividade não encontrada'),
+}
+
+
+def converter(model, dados):
+    """Valida os campos enviados e devolve {campo: valor já convertido}."""
+    campos = CAMPOS[model]
+    invalidos = [c for c in dados if c not in campos]
+    if invalidos:
+        raise AlteracaoInvalida(f"Campos inválidos: {', '.join(invalidos)}")
+    alteracoes = {}
+    for campo, valor in dados.items():
+        if valor is None and not model.__table__.columns[campo].nullable:
+            raise AlteracaoInvalida(f"O campo {campo} não pode ser nulo")
+        try:
+            alteracoes[campo] = campos[campo](valor) if campos[campo] and valor is not None else valor
+        except (TypeError, ValueError):
+            raise AlteracaoInvalida(f"Valor inválido para {campo}")
+    return alteracoes
+
+
+def referencias_inexistentes(valores_por_campo):
+    """Confere cada valor distinto de chave estrangeira uma única vez; devolve a mensagem de erro ou None."""
+    for campo, valores in valores_por_campo.items():
+        if campo not in REFERENCIAS or not valores:
+            continue
+        inexistentes, mensagem = REFERENCIAS[campo]
+        faltando = inexistentes({v for v in valores if v is not None})
+        if faltando:
+            return f"{mensagem}: {', '.join(map(str, faltando))}"
+    return None
+
+
+@requer_gerenciamento
+def atualizar_em_lote(model):
+    data = request.get_json(silent=True) or {}
+    itens = data.get('itens')
+    if not isinstance(itens, list) or not itens:
+        return jsonify({'erro': 'Informe a lista de itens'}), 400
+    if len(itens) > ATUALIZACAO_MAX_ITENS:
+        return jsonify({'erro': f'Máximo de {ATUALIZACAO_MAX_ITENS} itens por requisição'}), 400
+
+    # Itens com as mesmas alterações viram um único UPDATE
+    grupos = {}
+    ids = set()
+    try:
+        for item in itens:
+            if not isinstance(item, dict) or not isinstance(item.get('id'), int):
+                raise AlteracaoInvalida('Cada item precisa de um id inteiro')
+            if item['id'] in ids:
+                raise AlteracaoInvalida(f"id repetido: {item['id']}")
+            ids.add(item['id'])
+            alteracoes = converter(model, {k: v for k, v in item.items() if k != 'id'})
+            if alteracoes:
+                grupos.setdefault(frozenset(alteracoes.items()), []).append(item['id'])
+    except AlteracaoInvalida as e:
+        return jsonify({'erro': str(e)}), 400
+    except TypeError:
+        return jsonify({'erro': 'Os valores dos campos devem ser simples (texto, número, booleano ou nulo)'}), 400
+
+    faltando = _inexistentes(model, ids)
+    if faltando:
+        return jsonify({'erro': f"{NAO_ENCONTRADO[model]}: {', '.join(map(str, faltando))}"}), 404
+    valores_por_campo = {}
+    for alteracoes in grupos:
+        for campo, valor in alteracoes:
+            valores_por_campo.setdefault(campo, set()).add(valor)
+    erro = referencias_inexistentes(valores_por_campo)
+    if erro:
+        return jsonify({'erro': erro}), 404
+
+    alterados = 0
+    for alteracoes, ids_grupo in grupos.items():
+        valores = dict(alteracoes)
+        # Só regrava as linhas em que algum dos campos realmente muda
+        muda = or_(*[getattr(model, c).is_distinct_from(v) for c, v in valores.items()])
+        for bloco in _em_blocos(ids_grupo):
+            resultado = db.session.execute(
+                update(model).where(model.id.in_(bloco), muda).values(**valores)
+                .execution_options(synchronize_session=False)
+            )
+            alterados += resultado.rowcount
+    db.session.commit()
+    return jsonify({'itens': len(itens), 'alterados': alterados})
+
+
+@requer_gerenciamento
+def aplicar_patch(model, id):
+    obj = db.session.get(model, id)
+    if not obj:
+        return jsonify({'erro': NAO_ENCONTRADO[model]}), 404
+    data = request.get_json(silent=True)
+    if not isinstance(data, dict):
+        return jsonify({'erro': 'Envie um objeto com os campos a alterar'}), 400
+    try:
+        alteracoes = converter(model, data)
+    except AlteracaoInvalida as e:
+        return jsonify({'erro': str(e)}), 400
+
+    mudancas = {c: v for c, v in alteracoes.items() if getattr(obj, c) != v}
+    erro = referencias_inexistentes({c: {v} for c, v in mudancas.items()})
+    if erro:
+        return jsonify({'erro': erro}), 404
+    if mudancas:
+        # O UPDATE gerado pelo ORM inclui só as colunas alteradas aqui
+        for campo, valor in mudancas.items():
+            setattr(obj, campo, valor)
+        db.session.commit()
+    return jsonify(to_dict(obj))
+
+
+@bp.route('/atividades', methods=['PATCH'])
+def atualizar_atividades_em_lote():
+    """
+    Atualizar várias atividades
+    ---
+    tags: [Atividades]
+    description: Itens com as mesmas alterações são gravados com um único UPDATE e cada professor_id e turma_id distinto é validado uma vez no Gerenciamento. Se algum id não existir, nada é alterado.
+    parameters:
+      - name: body
+        in: body
+        required: true
+        schema:
+          type: object
+          required: [itens]
+          properties:
+            itens:
+              type: array
+              items: { type: object, example: { id: 1, data_entrega: "2025-12-15" } }
+    responses:
+      200: { description: "Quantidade de itens recebidos e de linhas alteradas" }
+      400: { description: "Itens inválidos" }
+      404: { description: "Atividade, Professor ou Turma não encontrado" }
+      502: { description: "Serviço de Gerenciamento indisponível" }
+      503: { description: "Serviço de Gerenciamento sobrecarregado; repetir após o Retry-After" }
+    """
+    return atualizar_em_lote(Atividade)
+
+
+@bp.route('/atividades/<int:id>', methods=['PATCH'])
+def alterar_atividade(id):
+    """
+    Alterar campos de uma atividade
+    ---
+    tags: [Atividades]
+    description: Altera apenas os campos enviados; o UPDATE inclui só as colunas cujo valor mudou.
+    parameters:
+      - { name: id, in: path, type: integer, required: true }
+      - name: body
+        in: body
+        required: true
+        schema:
+          type: object
+          properties:
+            nome_atividade: { type: string }
+            descricao: { type: string }
+            peso_projeto: { type: number, format: float }
+            data_entrega: { type: string, format: date }
+            turma_id: { type: integer }
+            professor_id: { type: integer }
+    responses:
+      200: { description: "Atividade atualizada" }
+      400: { description: "Campos inválidos" }
+      404: { description: "Atividade, Professor ou Turma não encontrado" }
+      502: { description: "Serviço de Gerenciamento indisponível" }
+      503: { description: "Serviço de Gerenciamento sobrecarregado; repetir após o Retry-After" }
+    """
+    return aplicar_patch(Atividade, id)
+
+
+@bp.route('/notas', methods=['PATCH'])
+def atualizar_notas_em_lote():
+    """
+    Atualizar várias notas
+    ---
+    tags: [Notas]
+    description: Itens com as mesmas alterações são gravados com um único UPDATE e cada aluno_id e atividade_id distinto é validado uma vez. Se algum id não existir, nada é alterado.
+    parameters:
+      - name: body
+        in: body
+        required: true
+        schema:
+          type: object
+          required: [itens]
+          properties:
+            itens:
+              type: array
+              items: { type: object, example: { id: 1, nota: 8.5 } }
+    responses:
+      200: { description: "Quantidade de itens recebidos e de linhas alteradas" }
+      400: { description: "Itens inválidos" }
+      404: { description: "Nota, Aluno ou Atividade não encontrado" }
+      502: { description: "Serviço de Gerenciamento indisponível" }
+      503: { description: "Serviço de Gerenciamento sobrecarregado; repetir após o Retry-After" }
+    """
+    return atualizar_em_lote(Nota)
+
+
+@bp.route('/notas/<int:id>', methods=['PATCH'])
+def alterar_nota(id):
+    """
+    Alterar campos de uma nota
+    ---
+    tags: [Notas]
+    description: Altera apenas os campos enviados; o UPDATE inclui só as colunas cujo valor mudou.
+    parameters:
+      - { name: id, in: path, type: integer, required: true }
+      - name: body
+        in: body
+        required: true
+        schema:
+          type: object
+          properties:
+            nota: { type: number, format: float }
+            aluno_id: { type: integer }
+            atividade_id: { type: integer }
+    responses:
+      200: { description: "Nota atualizada" }
+      400: { description: "Campos inválidos" }
+      404: { description: "Nota, Aluno ou Atividade não encontrado" }
+      502: { description: "Serviço de Gerenciamento indisponível" }
+      503: { description: "Serviço de Gerenciamento sobrecarregado; repetir após o Retry-After" }
+    """
+    return aplicar_patch(Nota, id)
@@ -0,0 +1,99 @@
+"""Geração de dados sintéticos para testes de escala.
+
+Usa as mesmas fórmulas de IDs do serviço de Gerenciamento (professor da turma `t` é
+`(t - 1) % professores + 1`; alunos da turma `t` são `t, t + turmas, t + 2 * turmas, ...`).
+Rodando `flask gerar-dados` com os mesmos tamanhos nos três serviços, as atividades e notas
+apontam para professores, turmas e alunos que existem no Gerenciamento. Os IDs das próprias
+atividades e notas começam depois dos já usados, inclusive os arquivados, e por isso nunca
+repetem um registro do arquivo.
+"""
+import random
+from datetime import date, timedelta
+from itertools import islice
+
+import click
+
+from app.arquivo import ultimo_id_usado
+from app.database import db
+from app.models import Atividade, AtividadeArquivada, Nota, NotaArquivada
+
+DATA_BASE = date(2024, 1, 1)
+TIPOS = ['Trabalho', 'Prova', 'Lista de Exercícios', 'Projeto', 'Seminário', 'Relatório']
+
+
+def professor_da_turma(turma_id, professores):
+    return (turma_id - 1) % professores + 1
+
+
+def alunos_da_turma(turma_id, turmas, alunos):
+    return range(turma_id, alunos + 1, turmas)
+
+
+def gerar_atividades(rnd, turmas, professores, por_turma, primeiro_id=1):
+    atividade_id = primeiro_id - 1
+    for t in range(1, turmas + 1):
+        for k in range(1, por_turma + 1):
+            atividade_id += 1
+            tipo = rnd.choice(TIPOS)
+            descricao = f"{tipo} {k} da turma {t}. " + "Entregar pelo portal até a data combinada. " * rnd.randint(1, 5)
+            entrega = DATA_BASE + timedelta(days=rnd.randint(0, 730))
+            yield (atividade_id, f"{tipo} {k}", descricao, round(rnd.uniform(0.1, 0.5), 2),
+                   entrega.isoformat(), t, professor_da_turma(t, professores))
+
+
+def gerar_notas(rnd, turmas, alunos, por_turma, primeiro_id=1, primeira_atividade=1):
+    nota_id = primeiro_id - 1
+    atividade_id = primeira_atividade - 1
+    for t in range(1, turmas + 1):
+        for _ in range(por_turma):
+            atividade_id += 1
+            for aluno_id in alunos_da_turma(t, turmas, alunos):
+                nota_id += 1
+                yield (nota_id, round(rnd.uniform(0, 10), 1), aluno_id, atividade_id)
+
+
+def carregar(conn, sql, linhas, lote):
+    """Insere as linhas com executemany, numa transação a cada `lote` linhas."""
+    total = 0
+    while True:
+        bloco = list(islice(linhas, lote))
+        if not bloco:
+            return total
+        conn.exec_driver_sql(sql, bloco)
+        conn.commit()
+        total += len(bloco)
+
+
+def registrar_comando(app):
+    @app.cli.command('gerar-dados')
+    @click.option('--seed', default=42, show_default=True)
+    @click.option('--professores', default=100, show_default=True)
+    @click.option('--turmas', default=500, show_default=True)
+    @click.option('--alunos', default=20000, show_default=True)
+    @click.option('--atividades-por-turma', default=5, show_default=True)
+    @click.option('--reservas-por-turma', default=10, show_default=True, help='Usado pelo serviço de Reservas.')
+    @click.option('--lote', default=50000, show_default=True, help='Linhas por transação.')
+    @click.option('--limpar', is_flag=True, help='Apaga os dados existentes antes de gerar.')
+    def gerar_dados(seed, professores, turmas, alunos, atividades_por_turma, reservas_por_turma, lote, limpar):
+        """Gera atividades e notas sintéticas direto no banco SQLite."""
+        with db.engine.connect() as conn:
+            existentes = conn.exec_driver_sql("SELECT COUNT(*) FROM atividade").scalar()
+            if existentes and not limpar:
+                raise click.ClickException('O banco já tem dados; use --limpar para substituí-los.')
+            conn.exec_driver_sql('PRAGMA synchronous = OFF')
+            if limpar:
+                for tabela in ('nota', 'atividade'):
+                    conn.exec_driver_sql(f'DELETE FROM {tabela}')
+                conn.commit()
+            primeira_atividade = ultimo_id_usado(conn, Atividade.__table__, AtividadeArquivada.__table__) + 1
+            primeira_nota = ultimo_id_usado(conn, Nota.__table__, NotaArquivada.__table__) + 1
+
+            n = carregar(conn, 'INSERT INTO atividade (id, nome_atividade, descricao, peso_projeto, data_entrega, '
+                               'turma_id, professor_id) VALUES (?, ?, ?, ?, ?, ?, ?)',
+                         gerar_atividades(random.Random(seed * 10 + 4), turmas, professores, atividades_por_turma,
+                                          primeira_atividade), lote)
+            click.echo(f'{n} atividades')
+            n = carregar(conn, 'INSERT INTO nota (id, nota, aluno_id, atividade_id) VALUES (?, ?, ?, ?)',
+                         gerar_notas(random.Random(seed * 10 + 5), turmas, alunos, atividades_por_turma,
+                                     primeira_nota, primeira_atividade), lote)
+            click.echo(f'{n} notas')
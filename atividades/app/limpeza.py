@@ -0,0 +1,77 @@
+"""Remoção das atividades e notas ligadas a turmas e alunos apagados no Gerenciamento.
+
+O Gerenciamento chama POST /limpeza/turmas/<id> e POST /limpeza/alunos/<id> ao apagar uma
+turma ou um aluno; as rotas só agendam a tarefa e respondem 202. As tarefas apagam em
+lotes de LIMPEZA_LOTE, pelos índices de turma_id, atividade_id e aluno_id, com um commit
+por lote.
+"""
+import os
+
+from flask import jsonify
+from sqlalchemy import delete, select
+
+from app.database import db
+from app.fila import enfileirar, tarefa
+from app.models import Atividade, Nota
+from app.routes import atividades_bp
+
+LIMPEZA_LOTE = int(os.getenv('LIMPEZA_LOTE', '1000'))
+
+
+@tarefa('limpar_turma')
+def limpar_turma(turma_id):
+    atividades, notas = Atividade.__table__, Nota.__table__
+    while True:
+        ids = db.session.execute(
+            select(atividades.c.id).where(atividades.c.turma_id == turma_id).limit(LIMPEZA_LOTE)
+        ).scalars().all()
+        if not ids:
+            return
+        db.session.execute(delete(notas).where(notas.c.atividade_id.in_(ids)))
+        db.session.execute(delete(atividades).where(atividades.c.id.in_(ids)))
+        db.session.commit()
+
+
+@tarefa('limpar_aluno')
+def limpar_aluno(aluno_id):
+    notas = Nota.__table__
+    while True:
+        lote = select(notas.c.id).where(notas.c.aluno_id == aluno_id).limit(LIMPEZA_LOTE)
+        apagadas = db.session.execute(delete(notas).where(notas.c.id.in_(lote))).rowcount
+        db.session.commit()
+        if apagadas < LIMPEZA_LOTE:
+            return
+
+
+@atividades_bp.route('/limpeza/turmas/<int:id>', methods=['POST'])
+def agendar_limpeza_turma(id):
+    """
+    Agendar a remoção das atividades (e notas) de uma turma apagada
+    ---
+    tags: [Atividades]
+    description: Chamado pelo Gerenciamento ao apagar uma turma. Os registros são apagados em segundo plano.
+    parameters:
+      - { name: id, in: path, type: integer, required: true }
+    responses:
+      202: { description: "Remoção agendada" }
+    """
+    enfileirar('limpar_turma', turma_id=id)
+    db.session.commit()
+    return jsonify({'mensagem': 'Remoção agendada'}), 202
+
+
+@atividades_bp.route('/limpeza/alunos/<int:id>', methods=['POST'])
+def agendar_limpeza_aluno(id):
+    """
+    Agendar a remoção das notas de um aluno apagado
+    ---
+    tags: [Notas]
+    description: Chamado pelo Gerenciamento ao apagar um aluno. As notas são apagadas em segundo plano.
+    parameters:
+      - { name: id, in: path, type: integer, required: true }
+    responses:
+      202: { description: "Remoção agendada" }
+    """
+    enfileirar('limpar_aluno', aluno_id=id)
+    db.session.commit()
+    return jsonify({'mensagem': 'Remoção agendada'}), 202
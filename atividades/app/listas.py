@@ -0,0 +1,103 @@
+"""Respostas de listagem geradas aos poucos, com gzip durante o envio.
+
+As rotas de listagem passam a query para `responder_lista`, que lê as linhas em páginas
+de LISTA_LOTE (por id, cada página numa consulta própria), serializa uma por vez e envia
+o array JSON em blocos, sem montar a lista inteira na memória. Se o cliente
+aceita gzip e a resposta passa de LISTA_GZIP_MINIMO bytes, os blocos são comprimidos
+enquanto são enviados; respostas menores saem de uma vez, sem compressão.
+"""
+import os
+import zlib
+from itertools import chain
+
+from flask import Response, current_app, jsonify, request, stream_with_context
+
+from app import admissao, rastreamento
+from app.database import db
+from app.formato import JSON, formato_resposta
+
+LISTA_LOTE = int(os.getenv('LISTA_LOTE', '1000'))  # linhas por página
+LISTA_GZIP_MINIMO = int(os.getenv('LISTA_GZIP_MINIMO', '8192'))
+LISTA_GZIP_NIVEL = int(os.getenv('LISTA_GZIP_NIVEL', '6'))  # 1 (rápido) a 9 (menor); 0 desliga
+TAMANHO_BLOCO = 64 * 1024
+
+
+def _paginas(query, coluna_id):
+    # Cada página usa a sessão atual: depois que a view retorna, o Flask-SQLAlchemy fecha
+    # a sessão da requisição e o restante é lido com outra, dentro do stream_with_context
+    ultimo = None
+    while True:
+        pagina = query.with_session(db.session())
+        if ultimo is not None:
+            pagina = pagina.filter(coluna_id > ultimo)
+        linhas = pagina.order_by(coluna_id).limit(LISTA_LOTE).all()
+        yield from linhas
+        if len(linhas) < LISTA_LOTE:
+            return
+        ultimo = getattr(linhas[-1], coluna_id.key)
+
+
+def _blocos(linhas, serializar):
+    """Gera o array JSON (no mesmo formato do jsonify) em blocos de ~TAMANHO_BLOCO bytes."""
+    dumps = current_app.json.dumps
+    partes, tamanho = [b'['], 1
+    for i, linha in enumerate(linhas):
+        parte = (b',' if i else b'') + dumps(serializar(linha), separators=(',', ':')).encode()
+        partes.append(parte)
+        tamanho += len(parte)
+        if tamanho >= TAMANHO_BLOCO:
+            yield b''.join(partes)
+            partes, tamanho = [], 0
+    partes.append(b']\n')
+    yield b''.join(partes)
+
+
+def _gzip(blocos, nivel):
+    compressor = zlib.compressobj(nivel, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+    for bloco in blocos:
+        saida = compressor.compress(bloco)
+        if saida:
+            yield saida
+    yield compressor.flush()
+
+
+def resposta_em_streaming(corpo, **kwargs):
+    """Response gerada aos poucos que mantém a vaga de admissão e o span SERVER até o fim do envio.
+
+    Os teardown_request rodam assim que a view retorna, antes de o corpo ser gerado; sem
+    isso as consultas das páginas ficariam fora do limite de admissão e do rastreamento.
+    """
+    resp = Response(stream_with_context(corpo), **kwargs)
+    admissao.acompanhar_resposta(resp)
+    rastreamento.acompanhar_resposta(resp)
+    return resp
+
+
+def responder_lista(query, coluna_id, serializar):
+    """Responde com [serializar(l) for l in query], em ordem de `coluna_id`."""
+    if formato_resposta() != JSON:
+        # MessagePack não é gerado em streaming
+        return jsonify([serializar(l) for l in query.order_by(coluna_id)])
+
+    blocos = _blocos(_paginas(query, coluna_id), serializar)
+    inicio, tamanho = [], 0
+    for bloco in blocos:
+        inicio.append(bloco)
+        tamanho += len(bloco)
+        if tamanho >= LISTA_GZIP_MINIMO:
+            break
+    else:
+        # A lista inteira ficou abaixo do mínimo: resposta comum, sem compressão
+        resp = Response(b''.join(inicio), mimetype=JSON)
+        resp.vary.add('Accept')
+        return resp
+
+    corpo = chain(inicio, blocos)
+    headers = {}
+    if LISTA_GZIP_NIVEL > 0 and request.accept_encodings['gzip']:
+        corpo = _gzip(corpo, LISTA_GZIP_NIVEL)
+        headers['Content-Encoding'] = 'gzip'
+    resp = resposta_em_streaming(corpo, mimetype=JSON, headers=headers)
+    resp.vary.add('Accept')
+    resp.vary.add('Accept-Encoding')
+    return resp
@@ -0,0 +1,150 @@
+import os
+import re
+
+from flask import current_app, g, jsonify, request
+from werkzeug.exceptions import HTTPException
+
+from app.database import db
+from app.rastreamento import span
+from app.routes import atividades_bp as bp
+
+BATCH_MAX_OPERACOES = int(os.getenv('BATCH_MAX_OPERACOES', '500'))
+METODOS = ('GET', 'POST', 'PUT', 'PATCH', 'DELETE')
+_REFERENCIA = re.compile(r'\$(\d+)\.(\w+)')
+
+
+class ReferenciaInvalida(Exception):
+    pass
+
+
+def _valor_referenciado(resultados, indice, campo):
+    indice = int(indice)
+    if indice >= len(resultados) or not isinstance(resultados[indice]['corpo'], dict) \
+            or campo not in resultados[indice]['corpo']:
+        raise ReferenciaInvalida(f'${indice}.{campo}')
+    return resultados[indice]['corpo'][campo]
+
+
+def _resolver(valor, resultados):
+    """Troca as referências $n.campo pelo campo do resultado da operação n."""
+    if isinstance(valor, dict):
+        return {k: _resolver(v, resultados) for k, v in valor.items()}
+    if isinstance(valor, list):
+        return [_resolver(v, resultados) for v in valor]
+    if isinstance(valor, str):
+        m = _REFERENCIA.fullmatch(valor)
+        if m:
+            # Valor inteiro é uma referência: mantém o tipo original (ex.: int)
+            return _valor_referenciado(resultados, *m.groups())
+        return _REFERENCIA.sub(lambda m: str(_valor_referenciado(resultados, *m.groups())), valor)
+    return valor
+
+
+def _executar(metodo, caminho, corpo):
+    """Executa uma rota do serviço diretamente, sem passar pela rede nem pelos before_request."""
+    adapter = current_app.url_map.bind('localhost')
+    try:
+        endpoint, view_args = adapter.match(caminho.split('?', 1)[0], method=metodo)
+    except HTTPException as e:
+        return e.code, {'erro': e.description}
+    if endpoint == request.endpoint:
+        return 400, {'erro': 'Operações /batch não podem ser aninhadas'}
+
+    # A sub-requisição usa o mesmo `g` do /batch: sem isto, os teardown_request dela
+    # liberariam a vaga de admissão e encerrariam o span SERVER do próprio lote
+    do_lote = {chave: g.pop(chave) for chave in ('admitida', 'span') if chave in g}
+    try:
+        with current_app.test_request_context(caminho, method=metodo, json=corpo):
+            with span(f"{metodo} {caminho.split('?', 1)[0]}"):
+                resp = current_app.make_response(current_app.view_functions[endpoint](**view_args))
+                # O corpo é lido aqui dentro: listas em streaming são geradas só agora, e
+                # fechá-las dispara de novo os teardown_request da sub-requisição
+                try:
+                    resposta = resp.get_json(silent=True)
+                finally:
+                    resp.close()
+    finally:
+        for chave, valor in do_lote.items():
+            setattr(g, chave, valor)
+    return resp.status_code, resposta
+
+
+@bp.route('/batch', methods=['POST'])
+def executar_lote():
+    """
+    Executar várias operações numa única requisição
+    ---
+    tags: [Batch]
+    description: >
+      Executa as operações na ordem, dentro do próprio serviço. Strings no formato $n.campo
+      (no caminho ou no corpo) são trocadas pelo campo do resultado da operação n, começando em 0;
+      ex. "/atividades/$0.id/notas". A execução para na primeira operação com erro. Com "transacao": true,
+      tudo é gravado num único commit no fim, ou desfeito se alguma operação falhar.
+    parameters:
+      - name: body
+        in: body
+        required: true
+        schema:
+          type: object
+          required: [operacoes]
+          properties:
+            transacao: { type: boolean, example: true }
+            operacoes:
+              type: array
+              items:
+                type: object
+                required: [metodo, caminho]
+                properties:
+                  metodo: { type: string, example: "POST" }
+                  caminho: { type: string, example: "/notas" }
+                  corpo: { type: object, example: { nota: 8.5, aluno_id: 1, atividade_id: "$0.id" } }
+    responses:
+      200: { description: "Resultado de cada operação" }
+      400: { description: "Lote inválido" }
+    """
+    data = request.get_json(silent=True) or {}
+    operacoes = data.get('operacoes')
+    if not isinstance(operacoes, list) or not operacoes:
+        return jsonify({'erro': 'Informe a lista de operações'}), 400
+    if len(operacoes) > BATCH_MAX_OPERACOES:
+        return jsonify({'erro': f'Máximo de {BATCH_MAX_OPERACOES} operações por lote'}), 400
+    for op in operacoes:
+        if not isinstance(op, dict) or not isinstance(op.get('metodo'), str) or not isinstance(op.get('caminho'), str) \
+                or op['metodo'].upper() not in METODOS or not op['caminho'].startswith('/'):
+            return jsonify({'erro': 'Cada operação precisa de metodo e caminho válidos'}), 400
+
+    transacao = bool(data.get('transacao', False))
+    resultados = []
+    falha = None
+    db.session.info['adiar_commit'] = transacao
+    try:
+        for indice, op in enumerate(operacoes):
+            try:
+                caminho = _resolver(op['caminho'], resultados)
+                corpo = _resolver(op.get('corpo'), resultados)
+            except ReferenciaInvalida as e:
+                status, resposta = 400, {'erro': f'Referência inválida: {e}'}
+            else:
+                try:
+                    status, resposta = _executar(op['metodo'].upper(), caminho, corpo)
+                except HTTPException as e:
+                    # Erro HTTP da própria rota (ex.: 415 de get_json() sem corpo)
+                    db.session.rollback()
+                    status, resposta = e.code, {'erro': e.description}
+                except Exception:
+                    current_app.logger.exception('Erro na operação %d do lote', indice)
+                    db.session.rollback()
+                    status, resposta = 500, {'erro': 'Erro interno'}
+            resultados.append({'status': status, 'corpo': resposta})
+            if status >= 400:
+                falha = indice
+                break
+    finally:
+        db.session.info.pop('adiar_commit', None)
+
+    if transacao:
+        if falha is None:
+            db.session.commit()
+        else:
+            db.session.rollback()
+    return jsonify({'concluido': falha is None, 'falha': falha, 'transacao': transacao, 'resultados': resultados})
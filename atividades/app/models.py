@@ -1,17 +1,52 @@
 from app.database import db
 
 class Atividade(db.Model):
+    # AUTOINCREMENT: IDs de registros arquivados nunca são reaproveitados
+    __table_args__ = {'sqlite_autoincrement': True}
     id = db.Column(db.Integer, primary_key=True)
     nome_atividade = db.Column(db.String(100), nullable=False)
     descricao = db.Column(db.Text, nullable=False)
     peso_projeto = db.Column(db.Float, nullable=False)
     data_entrega = db.Column(db.Date, nullable=False)
-    turma_id = db.Column(db.Integer, nullable=False)
-    professor_id = db.Column(db.Integer, nullable=False)
+    turma_id = db.Column(db.Integer, nullable=False, index=True)
+    professor_id = db.Column(db.Integer, nullable=False, index=True)
     notas = db.relationship('Nota', backref='atividade', lazy=True, cascade="all, delete-orphan")
 
 class Nota(db.Model):
+    # AUTOINCREMENT: IDs de registros arquivados nunca são reaproveitados
+    __table_args__ = {'sqlite_autoincrement': True}
     id = db.Column(db.Integer, primary_key=True)
     nota = db.Column(db.Float, nullable=False)
-    aluno_id = db.Column(db.Integer, nullable=False)
-    atividade_id = db.Column(db.Integer, db.ForeignKey('atividade.id'), nullable=False)
+    aluno_id = db.Column(db.Integer, nullable=False, index=True)
+    atividade_id = db.Column(db.Integer, db.ForeignKey('atividade.id'), nullable=False, index=True)
+
+# Atividades (e suas notas) antigas movidas para o banco de arquivo (ver app/arquivo.py)
+class AtividadeArquivada(db.Model):
+    __bind_key__ = 'arquivo'
+    __tablename__ = 'atividade_arquivada'
+    id = db.Column(db.Integer, primary_key=True)
+    nome_atividade = db.Column(db.String(100), nullable=False)
+    descricao = db.Column(db.Text, nullable=False)
+    peso_projeto = db.Column(db.Float, nullable=False)
+    data_entrega = db.Column(db.Date, nullable=False)
+    turma_id = db.Column(db.Integer, nullable=False, index=True)
+    professor_id = db.Column(db.Integer, nullable=False, index=True)
+
+class NotaArquivada(db.Model):
+    __bind_key__ = 'arquivo'
+    __tablename__ = 'nota_arquivada'
+    id = db.Column(db.Integer, primary_key=True)
+    nota = db.Column(db.Float, nullable=False)
+    aluno_id = db.Column(db.Integer, nullable=False, index=True)
+    atividade_id = db.Column(db.Integer, db.ForeignKey('atividade_arquivada.id'), nullable=False, index=True)
+
+# Tarefas da fila em segundo plano (ver app/fila.py)
+class Tarefa(db.Model):
+    __table_args__ = (db.Index('ix_tarefa_estado_executar_em', 'estado', 'executar_em'),)
+    id = db.Column(db.Integer, primary_key=True)
+    tipo = db.Column(db.String(50), nullable=False)
+    dados = db.Column(db.Text, nullable=False)  # argumentos em JSON
+    estado = db.Column(db.String(20), nullable=False, default='pendente')
+    tentativas = db.Column(db.Integer, nullable=False, default=0)
+    executar_em = db.Column(db.Float, nullable=False)  # time.time() a partir do qual pode rodar
+    erro = db.Column(db.Text)
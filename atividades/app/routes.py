@@ -1,29 +1,82 @@
 from flask import Blueprint, request, jsonify
-from app.models import db, Atividade, Nota
-import requests, os
+from app.models import db, Atividade, AtividadeArquivada, Nota, NotaArquivada
+from app.formato import ler_resposta
+from app.idempotencia import idempotente
+from app.listas import responder_lista, resposta_em_streaming
+from app.servicos import GERENCIAMENTO_URL, TIMEOUT, existe_no_gerenciamento, requer_gerenciamento, sessao
+from sqlalchemy.orm import load_only
+import requests, os, csv, io, json
 from datetime import datetime
 
 atividades_bp = Blueprint('atividades', __name__)
-GERENCIAMENTO_URL = os.getenv('GERENCIAMENTO_URL', 'http://gerenciamento:5000')
+EXPORT_CHUNK = int(os.getenv('EXPORT_CHUNK', '1000'))
+ALUNOS_POR_CONSULTA = 200
 
-# Helper to convert model objects to dictionary
-def to_dict(obj):
+# Helper to convert model objects to dictionary (optionally only some fields)
+def to_dict(obj, campos=None):
     if obj is None:
         return None
-    d = {c.name: getattr(obj, c.name) for c in obj.__table__.columns}
+    nomes = campos or [c.name for c in obj.__table__.columns]
+    d = {n: getattr(obj, n) for n in nomes}
     if 'data_entrega' in d and d['data_entrega']:
         d['data_entrega'] = d['data_entrega'].isoformat()
     return d
 
+# Helper for ?fields=a,b: returns (campos, erro); campos is None when every field is wanted
+def campos_solicitados(model):
+    fields = request.args.get('fields')
+    if not fields:
+        return None, None
+    campos = [f.strip() for f in fields.split(',') if f.strip()]
+    invalidos = [c for c in campos if c not in model.__table__.columns]
+    if invalidos:
+        return None, (jsonify({'erro': f"Campos inválidos: {', '.join(invalidos)}"}), 400)
+    return campos, None
+
+# Archived atividades/notas are only read when the request asks for ?arquivo=true
+def modelos_consultados():
+    if request.args.get('arquivo', '').lower() in ('1', 'true', 'sim'):
+        return AtividadeArquivada, NotaArquivada
+    return Atividade, Nota
+
+# Restrict the SELECT to the requested columns so large Text columns are never read
+def com_campos(query, model, campos):
+    if campos:
+        query = query.options(load_only(*[getattr(model, c) for c in campos]))
+    return query
+
+# Fetch the names of the given alunos from Gerenciamento in batches, filling `cache`
+def _resolver_nomes_alunos(ids, cache):
+    ids = sorted(ids)
+    for i in range(0, len(ids), ALUNOS_POR_CONSULTA):
+        lote = ids[i:i + ALUNOS_POR_CONSULTA]
+        try:
+            resp = sessao.get(f"{GERENCIAMENTO_URL}/alunos",
+                                params={'ids': ','.join(map(str, lote)), 'fields': 'id,nome'}, timeout=TIMEOUT)
+            encontrados = {a['id']: a['nome'] for a in ler_resposta(resp)} if resp.status_code == 200 else {}
+        except (requests.RequestException, ValueError, TypeError, KeyError):
+            # Falha de rede ou corpo ilegível: a exportação segue sem os nomes deste lote
+            encontrados = {}
+        for aluno_id in lote:
+            cache[aluno_id] = encontrados.get(aluno_id)
+
+def _linhas_csv(linhas):
+    buf = io.StringIO()
+    csv.writer(buf).writerows(linhas)
+    return buf.getvalue()
+
 # === CRUD ATIVIDADE ===
 
 @atividades_bp.route('/atividades', methods=['POST'])
+@idempotente
+@requer_gerenciamento
 def criar_atividade():
     """
     Criar uma nova atividade
     ---
     tags: [Atividades]
     parameters:
+      - { name: Idempotency-Key, in: header, type: string, required: false, description: "Chave para repetir a requisição com segurança" }
       - name: body
         in: body
         required: true
@@ -39,14 +92,16 @@ def criar_atividade():
             professor_id: { type: integer, example: 1 }
     responses:
       201: { description: "Atividade criada" }
+      422: { description: "Idempotency-Key já usada com outro corpo" }
       404: { description: "Professor ou Turma não encontrado" }
+      502: { description: "Serviço de Gerenciamento indisponível" }
+      503: { description: "Serviço de Gerenciamento sobrecarregado; repetir após o Retry-After" }
     """
     data = request.get_json()
     
     # Validate professor and turma exist in Gerenciamento
-    p_resp = requests.get(f"{GERENCIAMENTO_URL}/professores/{data['professor_id']}")
-    t_resp = requests.get(f"{GERENCIAMENTO_URL}/turmas/{data['turma_id']}")
-    if p_resp.status_code != 200 or t_resp.status_code != 200:
+    if not existe_no_gerenciamento('professores', data['professor_id']) \
+            or not existe_no_gerenciamento('turmas', data['turma_id']):
         return jsonify({'erro': 'Professor ou Turma não encontrado'}), 404
 
     atividade = Atividade(
@@ -67,11 +122,27 @@ def listar_atividades():
     Listar todas as atividades
     ---
     tags: [Atividades]
+    parameters:
+      - { name: turma_id, in: query, type: integer, required: false, description: "Filtrar por turma" }
+      - { name: professor_id, in: query, type: integer, required: false, description: "Filtrar por professor" }
+      - { name: fields, in: query, type: string, required: false, description: "Campos a retornar, separados por vírgula" }
+      - { name: arquivo, in: query, type: boolean, required: false, description: "Consultar os registros arquivados" }
     responses:
       200: { description: "Lista de atividades" }
+      400: { description: "Campos inválidos" }
     """
-    atividades = [to_dict(a) for a in Atividade.query.all()]
-    return jsonify(atividades)
+    campos, erro = campos_solicitados(Atividade)
+    if erro:
+        return erro
+    AtividadeModelo, _ = modelos_consultados()
+    query = com_campos(AtividadeModelo.query, AtividadeModelo, campos)
+    turma_id = request.args.get('turma_id', type=int)
+    if turma_id is not None:
+        query = query.filter_by(turma_id=turma_id)
+    professor_id = request.args.get('professor_id', type=int)
+    if professor_id is not None:
+        query = query.filter_by(professor_id=professor_id)
+    return responder_lista(query, AtividadeModelo.id, lambda a: to_dict(a, campos))
 
 @atividades_bp.route('/atividades/<int:id>', methods=['GET'])
 def obter_atividade(id):
@@ -81,16 +152,24 @@ def obter_atividade(id):
     tags: [Atividades]
     parameters:
       - { name: id, in: path, type: integer, required: true }
+      - { name: fields, in: query, type: string, required: false, description: "Campos a retornar, separados por vírgula" }
+      - { name: arquivo, in: query, type: boolean, required: false, description: "Consultar os registros arquivados" }
     responses:
       200: { description: "Dados da atividade" }
+      400: { description: "Campos inválidos" }
       404: { description: "Atividade não encontrada" }
     """
-    atividade = Atividade.query.get(id)
+    campos, erro = campos_solicitados(Atividade)
+    if erro:
+        return erro
+    AtividadeModelo, _ = modelos_consultados()
+    atividade = com_campos(AtividadeModelo.query, AtividadeModelo, campos).get(id)
     if not atividade:
         return jsonify({'erro': 'Atividade não encontrada'}), 404
-    return jsonify(to_dict(atividade))
+    return jsonify(to_dict(atividade, campos))
 
 @atividades_bp.route('/atividades/<int:id>', methods=['PUT'])
+@requer_gerenciamento
 def atualizar_atividade(id):
     """
     Atualizar uma atividade
@@ -113,6 +192,8 @@ def atualizar_atividade(id):
     responses:
       200: { description: "Atividade atualizada" }
       404: { description: "Atividade, Professor ou Turma não encontrado" }
+      502: { description: "Serviço de Gerenciamento indisponível" }
+      503: { description: "Serviço de Gerenciamento sobrecarregado; repetir após o Retry-After" }
     """
     atividade = Atividade.query.get(id)
     if not atividade:
@@ -120,14 +201,12 @@ def atualizar_atividade(id):
     data = request.get_json()
 
     if 'professor_id' in data:
-        p_resp = requests.get(f"{GERENCIAMENTO_URL}/professores/{data['professor_id']}")
-        if p_resp.status_code != 200:
+        if not existe_no_gerenciamento('professores', data['professor_id']):
             return jsonify({'erro': 'Professor não encontrado'}), 404
         atividade.professor_id = data['professor_id']
     
     if 'turma_id' in data:
-        t_resp = requests.get(f"{GERENCIAMENTO_URL}/turmas/{data['turma_id']}")
-        if t_resp.status_code != 200:
+        if not existe_no_gerenciamento('turmas', data['turma_id']):
             return jsonify({'erro': 'Turma não encontrada'}), 404
         atividade.turma_id = data['turma_id']
 
@@ -162,12 +241,15 @@ def deletar_atividade(id):
 # === CRUD NOTA ===
 
 @atividades_bp.route('/notas', methods=['POST'])
+@idempotente
+@requer_gerenciamento
 def criar_nota():
     """
     Criar uma nova nota
     ---
     tags: [Notas]
     parameters:
+      - { name: Idempotency-Key, in: header, type: string, required: false, description: "Chave para repetir a requisição com segurança" }
       - name: body
         in: body
         required: true
@@ -180,13 +262,15 @@ def criar_nota():
             atividade_id: { type: integer, example: 1 }
     responses:
       201: { description: "Nota criada" }
+      422: { description: "Idempotency-Key já usada com outro corpo" }
       404: { description: "Aluno ou Atividade não encontrado" }
+      502: { description: "Serviço de Gerenciamento indisponível" }
+      503: { description: "Serviço de Gerenciamento sobrecarregado; repetir após o Retry-After" }
     """
     data = request.get_json()
 
     # Validate aluno exists in Gerenciamento
-    a_resp = requests.get(f"{GERENCIAMENTO_URL}/alunos/{data['aluno_id']}")
-    if a_resp.status_code != 200:
+    if not existe_no_gerenciamento('alunos', data['aluno_id']):
         return jsonify({'erro': 'Aluno não encontrado'}), 404
 
     # Validate atividade exists
@@ -208,11 +292,92 @@ def listar_notas():
     Listar todas as notas
     ---
     tags: [Notas]
+    parameters:
+      - { name: aluno_id, in: query, type: integer, required: false, description: "Filtrar por aluno" }
+      - { name: atividade_id, in: query, type: integer, required: false, description: "Filtrar por atividade" }
+      - { name: turma_id, in: query, type: integer, required: false, description: "Filtrar pela turma da atividade" }
+      - { name: fields, in: query, type: string, required: false, description: "Campos a retornar, separados por vírgula" }
+      - { name: arquivo, in: query, type: boolean, required: false, description: "Consultar os registros arquivados" }
     responses:
       200: { description: "Lista de notas" }
+      400: { description: "Campos inválidos" }
     """
-    notas = [to_dict(n) for n in Nota.query.all()]
-    return jsonify(notas)
+    campos, erro = campos_solicitados(Nota)
+    if erro:
+        return erro
+    AtividadeModelo, NotaModelo = modelos_consultados()
+    query = com_campos(NotaModelo.query, NotaModelo, campos)
+    aluno_id = request.args.get('aluno_id', type=int)
+    if aluno_id is not None:
+        query = query.filter_by(aluno_id=aluno_id)
+    atividade_id = request.args.get('atividade_id', type=int)
+    if atividade_id is not None:
+        query = query.filter_by(atividade_id=atividade_id)
+    turma_id = request.args.get('turma_id', type=int)
+    if turma_id is not None:
+        query = query.join(AtividadeModelo, NotaModelo.atividade_id == AtividadeModelo.id).filter(AtividadeModelo.turma_id == turma_id)
+    return responder_lista(query, NotaModelo.id, lambda n: to_dict(n, campos))
+
+@atividades_bp.route('/notas/exportar', methods=['GET'])
+def exportar_notas():
+    """
+    Exportar todas as notas com os nomes do aluno e da atividade
+    ---
+    tags: [Notas]
+    description: As linhas são geradas e enviadas aos poucos (streaming), lendo o banco em blocos de EXPORT_CHUNK notas. Os nomes dos alunos são buscados no serviço de Gerenciamento em lote, uma vez por aluno.
+    parameters:
+      - { name: formato, in: query, type: string, enum: [ndjson, csv], required: false, description: "Formato da exportação (padrão ndjson)" }
+      - { name: turma_id, in: query, type: integer, required: false, description: "Filtrar pela turma da atividade" }
+      - { name: atividade_id, in: query, type: integer, required: false, description: "Filtrar por atividade" }
+    responses:
+      200: { description: "Notas exportadas" }
+      400: { description: "Formato inválido" }
+    """
+    formato = request.args.get('formato', 'ndjson')
+    if formato not in ('ndjson', 'csv'):
+        return jsonify({'erro': 'Formato inválido. Use ndjson ou csv.'}), 400
+
+    query = (db.session.query(Nota.id, Nota.nota, Nota.aluno_id, Nota.atividade_id, Atividade.nome_atividade)
+             .join(Atividade)
+             .order_by(Nota.id))
+    turma_id = request.args.get('turma_id', type=int)
+    if turma_id is not None:
+        query = query.filter(Atividade.turma_id == turma_id)
+    atividade_id = request.args.get('atividade_id', type=int)
+    if atividade_id is not None:
+        query = query.filter(Nota.atividade_id == atividade_id)
+
+    colunas = ['id', 'nota', 'aluno_id', 'aluno_nome', 'atividade_id', 'nome_atividade']
+
+    def gerar():
+        nomes_alunos = {}  # cache válido apenas durante esta exportação
+        if formato == 'csv':
+            yield _linhas_csv([colunas])
+        # Cada bloco é uma consulta própria por id (keyset): nenhum cursor fica aberto
+        # entre os blocos, então o SQLite não segura o lock de leitura durante a exportação
+        ultimo = None
+        while True:
+            pagina = query.with_session(db.session())
+            if ultimo is not None:
+                pagina = pagina.filter(Nota.id > ultimo)
+            bloco = pagina.limit(EXPORT_CHUNK).all()
+            if not bloco:
+                return
+            ultimo = bloco[-1].id
+            _resolver_nomes_alunos({r.aluno_id for r in bloco} - nomes_alunos.keys(), nomes_alunos)
+            linhas = [
+                [r.id, r.nota, r.aluno_id, nomes_alunos.get(r.aluno_id), r.atividade_id, r.nome_atividade]
+                for r in bloco
+            ]
+            if formato == 'csv':
+                yield _linhas_csv(linhas)
+            else:
+                yield ''.join(json.dumps(dict(zip(colunas, l)), ensure_ascii=False) + '\n' for l in linhas)
+
+    mimetype = 'text/csv' if formato == 'csv' else 'application/x-ndjson'
+    resp = resposta_em_streaming(gerar(), mimetype=mimetype)
+    resp.headers['Content-Disposition'] = f'attachment; filename=notas.{formato}'
+    return resp
 
 @atividades_bp.route('/notas/<int:id>', methods=['GET'])
 def obter_nota(id):
@@ -222,16 +387,24 @@ def obter_nota(id):
     tags: [Notas]
     parameters:
       - { name: id, in: path, type: integer, required: true }
+      - { name: fields, in: query, type: string, required: false, description: "Campos a retornar, separados por vírgula" }
+      - { name: arquivo, in: query, type: boolean, required: false, description: "Consultar os registros arquivados" }
     responses:
       200: { description: "Dados da nota" }
+      400: { description: "Campos inválidos" }
       404: { description: "Nota não encontrada" }
     """
-    nota = Nota.query.get(id)
+    campos, erro = campos_solicitados(Nota)
+    if erro:
+        return erro
+    _, NotaModelo = modelos_consultados()
+    nota = com_campos(NotaModelo.query, NotaModelo, campos).get(id)
     if not nota:
         return jsonify({'erro': 'Nota não encontrada'}), 404
-    return jsonify(to_dict(nota))
+    return jsonify(to_dict(nota, campos))
 
 @atividades_bp.route('/notas/<int:id>', methods=['PUT'])
+@requer_gerenciamento
 def atualizar_nota(id):
     """
     Atualizar uma nota
@@ -251,6 +424,8 @@ def atualizar_nota(id):
     responses:
       200: { description: "Nota atualizada" }
       404: { description: "Nota, Aluno ou Atividade não encontrado" }
+      502: { description: "Serviço de Gerenciamento indisponível" }
+      503: { description: "Serviço de Gerenciamento sobrecarregado; repetir após o Retry-After" }
     """
     nota = Nota.query.get(id)
     if not nota:
@@ -258,8 +433,7 @@ def atualizar_nota(id):
     data = request.get_json()
 
     if 'aluno_id' in data:
-        a_resp = requests.get(f"{GERENCIAMENTO_URL}/alunos/{data['aluno_id']}")
-        if a_resp.status_code != 200:
+        if not existe_no_gerenciamento('alunos', data['aluno_id']):
             return jsonify({'erro': 'Aluno não encontrado'}), 404
         nota.aluno_id = data['aluno_id']
 
@@ -300,13 +474,20 @@ def listar_notas_por_atividade(id):
     tags: [Notas]
     parameters:
       - { name: id, in: path, type: integer, required: true, description: "ID da Atividade" }
+      - { name: fields, in: query, type: string, required: false, description: "Campos a retornar, separados por vírgula" }
+      - { name: arquivo, in: query, type: boolean, required: false, description: "Consultar os registros arquivados" }
     responses:
       200: { description: "Lista de notas da atividade" }
+      400: { description: "Campos inválidos" }
       404: { description: "Atividade não encontrada" }
     """
-    atividade = Atividade.query.get(id)
-    if not atividade:
+    campos, erro = campos_solicitados(Nota)
+    if erro:
+        return erro
+    AtividadeModelo, NotaModelo = modelos_consultados()
+    if not AtividadeModelo.query.get(id):
         return jsonify({'erro': 'Atividade não encontrada'}), 404
     
-    notas = [to_dict(n) for n in atividade.notas]
+    query = com_campos(NotaModelo.query.filter_by(atividade_id=id), NotaModelo, campos)
+    notas = [to_dict(n, campos) for n in query]
     return jsonify(notas)
@@ -1,6 +1,8 @@
 from flask import Flask
 from flasgger import Swagger
-from app.database import db
+from app.database import criar_indices, db
+from app import admissao, atualizacao, dados_sinteticos, fila, formato, lote, rastreamento  # atualizacao e lote registram rotas no blueprint
+from app.busca import criar_indices_busca
 from app.routes import gerenciamento_bp
 
 def create_app():
@@ -9,8 +11,17 @@ def create_app():
     app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
     db.init_app(app)
     Swagger(app)
+    formato.instalar(app)
+    rastreamento.instalar(app, 'gerenciamento')
+    admissao.instalar(app, gerenciamento_bp)
+    fila.instalar(app)
     app.register_blueprint(gerenciamento_bp)
+    dados_sinteticos.registrar_comando(app)
+    fila.registrar_comando(app)
 
     with app.app_context():
         db.create_all()
+        criar_indices()
+        with db.engine.begin() as conn:
+            criar_indices_busca(conn)
     return app
@@ -0,0 +1,319 @@
+"""Atualização parcial (PATCH /<entidade>/<id>) e em lote (PATCH /<entidade>).
+
+O lote agrupa os itens com as mesmas alterações e executa um único
+`UPDATE ... WHERE id IN (...)` por grupo; as chaves estrangeiras são validadas com
+uma consulta por campo, não por item. Linhas que já têm os valores pedidos não
+são regravadas.
+"""
+import os
+from datetime import datetime
+
+from flask import jsonify, request
+from sqlalchemy import or_, select, update
+
+from app.models import db, Aluno, Professor, Turma
+from app.routes import gerenciamento_bp as bp, invalidar_detalhe, to_dict
+
+ATUALIZACAO_MAX_ITENS = int(os.getenv('ATUALIZACAO_MAX_ITENS', '5000'))
+IDS_POR_COMANDO = 500
+
+
+class AlteracaoInvalida(Exception):
+    pass
+
+
+def _data(valor):
+    return datetime.fromisoformat(valor).date() if valor else None
+
+
+# Campos que podem ser alterados, com a conversão do valor recebido (None = usar como veio)
+CAMPOS = {
+    Professor: {'nome': None, 'idade': None, 'materia': None, 'observacoes': None},
+    Turma: {'descricao': None, 'professor_id': None, 'ativo': None},
+    Aluno: {'nome': None, 'idade': None, 'turma_id': None, 'data_nascimento': _data},
+}
+# Campo de chave estrangeira -> (modelo referenciado, mensagem quando não existe)
+REFERENCIAS = {
+    'professor_id': (Professor, 'Professor não encontrado'),
+    'turma_id': (Turma, 'Turma não encontrada'),
+}
+NAO_ENCONTRADO = {Professor: 'Professor não encontrado', Turma: 'Turma não encontrada', Aluno: 'Aluno não encontrado'}
+
+
+def _em_blocos(valores):
+    valores = list(valores)
+    for i in range(0, len(valores), IDS_POR_COMANDO):
+        yield valores[i:i + IDS_POR_COMANDO]
+
+
+def _inexistentes(model, ids):
+    encontrados = set()
+    for bloco in _em_blocos(ids):
+        encontrados.update(db.session.execute(select(model.id).where(model.id.in_(bloco))).scalars())
+    return sorted(set(ids) - encontrados)
+
+
+def converter(model, dados):
+    """Valida os campos enviados e devolve {campo: valor já convertido}."""
+    campos = CAMPOS[model]
+    invalidos = [c for c in dados if c not in campos]
+    if invalidos:
+        raise AlteracaoInvalida(f"Campos inválidos: {', '.join(invalidos)}")
+    alteracoes = {}
+    for campo, valor in dados.items():
+        if valor is None and not model.__table__.columns[campo].nullable:
+            raise AlteracaoInvalida(f"O campo {campo} não pode ser nulo")
+        try:
+            alteracoes[campo] = campos[campo](valor) if campos[campo] and valor is not None else valor
+        except (TypeError, ValueError):
+            raise AlteracaoInvalida(f"Valor inválido para {campo}")
+    return alteracoes
+
+
+def referencias_inexistentes(valores_por_campo):
+    """Confere cada valor distinto de chave estrangeira uma única vez; devolve a mensagem de erro ou None."""
+    for campo, valores in valores_por_campo.items():
+        if campo not in REFERENCIAS or not valores:
+            continue
+        model, mensagem = REFERENCIAS[campo]
+        faltando = _inexistentes(model, {v for v in valores if v is not None})
+        if faltando:
+            return f"{mensagem}: {', '.join(map(str, faltando))}"
+    return None
+
+
+def atualizar_em_lote(model):
+    data = request.get_json(silent=True) or {}
+    itens = data.get('itens')
+    if not isinstance(itens, list) or not itens:
+        return jsonify({'erro': 'Informe a lista de itens'}), 400
+    if len(itens) > ATUALIZACAO_MAX_ITENS:
+        return jsonify({'erro': f'Máximo de {ATUALIZACAO_MAX_ITENS} itens por requisição'}), 400
+
+    # Itens com as mesmas alterações viram um único UPDATE
+    grupos = {}
+    ids = set()
+    try:
+        for item in itens:
+            if not isinstance(item, dict) or not isinstance(item.get('id'), int):
+                raise AlteracaoInvalida('Cada item precisa de um id inteiro')
+            if item['id'] in ids:
+                raise AlteracaoInvalida(f"id repetido: {item['id']}")
+            ids.add(item['id'])
+            alteracoes = converter(model, {k: v for k, v in item.items() if k != 'id'})
+            if alteracoes:
+                grupos.setdefault(frozenset(alteracoes.items()), []).append(item['id'])
+    except AlteracaoInvalida as e:
+        return jsonify({'erro': str(e)}), 400
+    except TypeError:
+        return jsonify({'erro': 'Os valores dos campos devem ser simples (texto, número, booleano ou nulo)'}), 400
+
+    faltando = _inexistentes(model, ids)
+    if faltando:
+        return jsonify({'erro': f"{NAO_ENCONTRADO[model]}: {', '.join(map(str, faltando))}"}), 404
+    valores_por_campo = {}
+    for alteracoes in grupos:
+        for campo, valor in alteracoes:
+            valores_por_campo.setdefault(campo, set()).add(valor)
+    erro = referencias_inexistentes(valores_por_campo)
+    if erro:
+        return jsonify({'erro': erro}), 404
+
+    alterados = 0
+    for alteracoes, ids_grupo in grupos.items():
+        valores = dict(alteracoes)
+        # Só regrava as linhas em que algum dos campos realmente muda
+        muda = or_(*[getattr(model, c).is_distinct_from(v) for c, v in valores.items()])
+        for bloco in _em_blocos(ids_grupo):
+            resultado = db.session.execute(
+                update(model).where(model.id.in_(bloco), muda).values(**valores)
+                .execution_options(synchronize_session=False)
+            )
+            alterados += resultado.rowcount
+    db.session.commit()
+    for id in ids:
+        invalidar_detalhe((model.__tablename__, id))
+    return jsonify({'itens': len(itens), 'alterados': alterados})
+
+
+def aplicar_patch(model, id):
+    obj = db.session.get(model, id)
+    if not obj:
+        return jsonify({'erro': NAO_ENCONTRADO[model]}), 404
+    data = request.get_json(silent=True)
+    if not isinstance(data, dict):
+        return jsonify({'erro': 'Envie um objeto com os campos a alterar'}), 400
+    try:
+        alteracoes = converter(model, data)
+    except AlteracaoInvalida as e:
+        return jsonify({'erro': str(e)}), 400
+
+    mudancas = {c: v for c, v in alteracoes.items() if getattr(obj, c) != v}
+    erro = referencias_inexistentes({c: {v} for c, v in mudancas.items()})
+    if erro:
+        return jsonify({'erro': erro}), 404
+    if mudancas:
+        # O UPDATE gerado pelo ORM inclui só as colunas alteradas aqui
+        for campo, valor in mudancas.items():
+            setattr(obj, campo, valor)
+        db.session.commit()
+        invalidar_detalhe((model.__tablename__, id))
+    return jsonify(to_dict(obj))
+
+
+@bp.route('/professores', methods=['PATCH'])
+def atualizar_professores_em_lote():
+    """
+    Atualizar vários professores
+    ---
+    tags: [Professores]
+    description: Itens com as mesmas alterações são gravados com um único UPDATE. Se algum id não existir, nada é alterado.
+    parameters:
+      - name: body
+        in: body
+        required: true
+        schema:
+          type: object
+          required: [itens]
+          properties:
+            itens:
+              type: array
+              items: { type: object, example: { id: 1, materia: "Física" } }
+    responses:
+      200: { description: "Quantidade de itens recebidos e de linhas alteradas" }
+      400: { description: "Itens inválidos" }
+      404: { description: "Professor não encontrado" }
+    """
+    return atualizar_em_lote(Professor)
+
+
+@bp.route('/professores/<int:id>', methods=['PATCH'])
+def alterar_professor(id):
+    """
+    Alterar campos de um professor
+    ---
+    tags: [Professores]
+    description: Altera apenas os campos enviados; o UPDATE inclui só as colunas cujo valor mudou.
+    parameters:
+      - { name: id, in: path, type: integer, required: true }
+      - name: body
+        in: body
+        required: true
+        schema:
+          type: object
+          properties:
+            nome: { type: string }
+            idade: { type: integer }
+            materia: { type: string }
+            observacoes: { type: string }
+    responses:
+      200: { description: "Professor atualizado" }
+      400: { description: "Campos inválidos" }
+      404: { description: "Professor não encontrado" }
+    """
+    return aplicar_patch(Professor, id)
+
+
+@bp.route('/turmas', methods=['PATCH'])
+def atualizar_turmas_em_lote():
+    """
+    Atualizar várias turmas
+    ---
+    tags: [Turmas]
+    description: Itens com as mesmas alterações são gravados com um único UPDATE e cada professor_id distinto é validado uma vez. Se algum id não existir, nada é alterado.
+    parameters:
+      - name: body
+        in: body
+        required: true
+        schema:
+          type: object
+          required: [itens]
+          properties:
+            itens:
+              type: array
+              items: { type: object, example: { id: 1, ativo: false } }
+    responses:
+      200: { description: "Quantidade de itens recebidos e de linhas alteradas" }
+      400: { description: "Itens inválidos" }
+      404: { description: "Turma ou Professor não encontrado" }
+    """
+    return atualizar_em_lote(Turma)
+
+
+@bp.route('/turmas/<int:id>', methods=['PATCH'])
+def alterar_turma(id):
+    """
+    Alterar campos de uma turma
+    ---
+    tags: [Turmas]
+    description: Altera apenas os campos enviados; o UPDATE inclui só as colunas cujo valor mudou.
+    parameters:
+      - { name: id, in: path, type: integer, required: true }
+      - name: body
+        in: body
+        required: true
+        schema:
+          type: object
+          properties:
+            descricao: { type: string }
+            professor_id: { type: integer }
+            ativo: { type: boolean }
+    responses:
+      200: { description: "Turma atualizada" }
+      400: { description: "Campos inválidos" }
+      404: { description: "Turma ou Professor não encontrado" }
+    """
+    return aplicar_patch(Turma, id)
+
+
+@bp.route('/alunos', methods=['PATCH'])
+def atualizar_alunos_em_lote():
+    """
+    Atualizar vários alunos
+    ---
+    tags: [Alunos]
+    description: Itens com as mesmas alterações são gravados com um único UPDATE e cada turma_id distinto é validado uma vez. Se algum id não existir, nada é alterado.
+    parameters:
+      - name: body
+        in: body
+        required: true
+        schema:
+          type: object
+          required: [itens]
+          properties:
+            itens:
+              type: array
+              items: { type: object, example: { id: 1, turma_id: 2 } }
+    responses:
+      200: { description: "Quantidade de itens recebidos e de linhas alteradas" }
+      400: { description: "Itens inválidos" }
+      404: { description: "Aluno ou Turma não encontrado" }
+    """
+    return atualizar_em_lote(Aluno)
+
+
+@bp.route('/alunos/<int:id>', methods=['PATCH'])
+def alterar_aluno(id):
+    """
+    Alterar campos de um aluno
+    ---
+    tags: [Alunos]
+    description: Altera apenas os campos enviados; o UPDATE inclui só as colunas cujo valor mudou.
+    parameters:
+      - { name: id, in: path, type: integer, required: true }
+      - name: body
+        in: body
+        required: true
+        schema:
+          type: object
+          properties:
+            nome: { type: string }
+            idade: { type: integer }
+            turma_id: { type: integer }
+            data_nascimento: { type: string, format: date }
+    responses:
+      200: { description: "Aluno atualizado" }
+      400: { description: "Campos inválidos" }
+      404: { description: "Aluno ou Turma não encontrado" }
+    """
+    return aplicar_patch(Aluno, id)
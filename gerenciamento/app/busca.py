@@ -0,0 +1,58 @@
+from sqlalchemy import text
+
+# Índices de texto completo (SQLite FTS5) sobre os nomes de alunos e professores.
+# São tabelas de "conteúdo externo": guardam só o índice e são mantidas em sincronia
+# com as tabelas originais por triggers, inclusive em inserções feitas fora do ORM.
+TABELAS_BUSCA = {'aluno': 'aluno_fts', 'professor': 'professor_fts'}
+
+LIMITE_PADRAO = 20
+LIMITE_MAXIMO = 100
+
+
+def _ddl(tabela, fts):
+    return [
+        f"""CREATE VIRTUAL TABLE IF NOT EXISTS {fts} USING fts5(
+            nome, content='{tabela}', content_rowid='id',
+            tokenize='unicode61 remove_diacritics 2', prefix='2 3')""",
+        f"""CREATE TRIGGER IF NOT EXISTS {fts}_ai AFTER INSERT ON {tabela} BEGIN
+            INSERT INTO {fts}(rowid, nome) VALUES (new.id, new.nome);
+        END""",
+        f"""CREATE TRIGGER IF NOT EXISTS {fts}_ad AFTER DELETE ON {tabela} BEGIN
+            INSERT INTO {fts}({fts}, rowid, nome) VALUES ('delete', old.id, old.nome);
+        END""",
+        f"""CREATE TRIGGER IF NOT EXISTS {fts}_au AFTER UPDATE OF nome ON {tabela} BEGIN
+            INSERT INTO {fts}({fts}, rowid, nome) VALUES ('delete', old.id, old.nome);
+            INSERT INTO {fts}(rowid, nome) VALUES (new.id, new.nome);
+        END""",
+    ]
+
+
+def criar_indices_busca(conn):
+    """Cria as tabelas FTS5 e os triggers, indexando as linhas que já existirem."""
+    for tabela, fts in TABELAS_BUSCA.items():
+        existia = conn.execute(
+            text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = :nome"), {'nome': fts}
+        ).first()
+        for comando in _ddl(tabela, fts):
+            conn.exec_driver_sql(comando)
+        if not existia:
+            conn.exec_driver_sql(f"INSERT INTO {fts}({fts}) VALUES ('rebuild')")
+
+
+def expressao_prefixo(q):
+    """Converte o texto digitado numa consulta FTS5 em que cada palavra casa por prefixo."""
+    termos = [t.replace('"', '') for t in q.split()]
+    return ' '.join(f'"{t}"*' for t in termos if t)
+
+
+def buscar_ids(conn, tabela, q, limite):
+    """Devolve os IDs que casam com `q`, do mais para o menos relevante (bm25)."""
+    expressao = expressao_prefixo(q)
+    if not expressao:
+        return []
+    fts = TABELAS_BUSCA[tabela]
+    linhas = conn.execute(
+        text(f"SELECT rowid FROM {fts} WHERE {fts} MATCH :q ORDER BY rank LIMIT :limite"),
+        {'q': expressao, 'limite': limite},
+    )
+    return [r[0] for r in linhas]
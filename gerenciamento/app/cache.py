@@ -0,0 +1,104 @@
+import threading
+import time
+from collections import OrderedDict
+
+
+class CacheTTL:
+    """Cache em memória simples com expiração por tempo (TTL, em segundos)."""
+
+    def __init__(self, ttl):
+        self.ttl = ttl
+        self._dados = {}
+        self._lock = threading.Lock()
+
+    def get(self, chave):
+        with self._lock:
+            item = self._dados.get(chave)
+            if item is None:
+                return None
+            expira_em, valor = item
+            if expira_em < time.monotonic():
+                del self._dados[chave]
+                return None
+            return valor
+
+    def set(self, chave, valor):
+        if self.ttl <= 0:
+            return
+        with self._lock:
+            agora = time.monotonic()
+            # Remove entradas vencidas para o cache não crescer indefinidamente
+            for k in [k for k, (exp, _) in self._dados.items() if exp < agora]:
+                del self._dados[k]
+            self._dados[chave] = (agora + self.ttl, valor)
+
+    def invalidar(self, chave):
+        with self._lock:
+            self._dados.pop(chave, None)
+
+
+class CacheLRU:
+    """Cache em memória de bytes, limitado pelo tamanho total; descarta os menos usados.
+
+    Para não guardar um valor lido antes de uma invalidação concorrente, quem vai ler do
+    banco pega `geracao()` antes e passa para `set`, que ignora o valor se houve invalidação.
+    """
+
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self._dados = OrderedDict()
+        self._bytes = 0
+        self._geracao = 0
+        self._lock = threading.Lock()
+        self.acertos = 0
+        self.falhas = 0
+        self.descartes = 0
+
+    def get(self, chave):
+        with self._lock:
+            valor = self._dados.get(chave)
+            if valor is None:
+                self.falhas += 1
+                return None
+            self._dados.move_to_end(chave)
+            self.acertos += 1
+            return valor
+
+    def geracao(self):
+        return self._geracao
+
+    def set(self, chave, valor, geracao):
+        if len(valor) > self.max_bytes:
+            return
+        with self._lock:
+            if geracao != self._geracao:
+                return
+            antigo = self._dados.pop(chave, None)
+            if antigo is not None:
+                self._bytes -= len(antigo)
+            self._dados[chave] = valor
+            self._bytes += len(valor)
+            while self._bytes > self.max_bytes:
+                _, descartado = self._dados.popitem(last=False)
+                self._bytes -= len(descartado)
+                self.descartes += 1
+
+    def invalidar(self, chave):
+        with self._lock:
+            self._geracao += 1
+            antigo = self._dados.pop(chave, None)
+            if antigo is not None:
+                self._bytes -= len(antigo)
+
+    def metricas(self):
+        with self._lock:
+            consultas = self.acertos + self.falhas
+            return {
+                'entradas': len(self._dados),
+                'bytes': self._bytes,
+                'max_bytes': self.max_bytes,
+                'acertos': self.acertos,
+                'falhas': self.falhas,
+                'taxa_acerto': round(self.acertos / consultas, 4) if consultas else 0.0,
+                'descartes': self.descartes,
+            }
@@ -0,0 +1,101 @@
+"""Geração de dados sintéticos para testes de escala.
+
+Os IDs seguem fórmulas fixas, iguais nos três serviços: o professor da turma `t` é
+`(t - 1) % professores + 1` e a turma do aluno `a` é `(a - 1) % turmas + 1`. Assim, rodando
+`flask gerar-dados` em cada serviço com os mesmos tamanhos, as referências entre os bancos
+ficam consistentes. Os dados dependem apenas de `--seed` e dos tamanhos.
+"""
+import random
+from datetime import date, timedelta
+from itertools import islice
+
+import click
+
+from app.database import db
+
+NOMES = ['Ana', 'Bruno', 'Carla', 'Daniel', 'Eduarda', 'Felipe', 'Gabriela', 'Henrique', 'Isabela',
+         'João', 'Larissa', 'Marcos', 'Natália', 'Otávio', 'Paula', 'Rafael', 'Sofia', 'Thiago',
+         'Vitória', 'Lucas', 'Mariana', 'Pedro', 'Beatriz', 'Gustavo', 'Letícia', 'Matheus']
+SOBRENOMES = ['Silva', 'Santos', 'Oliveira', 'Souza', 'Rodrigues', 'Ferreira', 'Alves', 'Pereira',
+              'Lima', 'Gomes', 'Costa', 'Ribeiro', 'Martins', 'Carvalho', 'Almeida', 'Lopes',
+              'Soares', 'Fernandes', 'Vieira', 'Barbosa', 'Rocha', 'Dias', 'Nascimento', 'Andrade']
+MATERIAS = ['Cálculo', 'Física', 'Química', 'Algoritmos', 'Banco de Dados', 'Redes', 'Estatística',
+            'Engenharia de Software', 'Sistemas Operacionais', 'Inteligência Artificial']
+DATA_BASE = date(2024, 1, 1)
+
+
+def professor_da_turma(turma_id, professores):
+    return (turma_id - 1) % professores + 1
+
+
+def turma_do_aluno(aluno_id, turmas):
+    return (aluno_id - 1) % turmas + 1
+
+
+def nome_aleatorio(rnd):
+    return f"{rnd.choice(NOMES)} {rnd.choice(SOBRENOMES)} {rnd.choice(SOBRENOMES)}"
+
+
+def gerar_professores(rnd, total):
+    for i in range(1, total + 1):
+        materia = rnd.choice(MATERIAS)
+        observacoes = f"Professor de {materia} desde {rnd.randint(1995, 2023)}." if rnd.random() < 0.5 else None
+        yield (i, nome_aleatorio(rnd), rnd.randint(28, 70), materia, observacoes)
+
+
+def gerar_turmas(rnd, total, professores):
+    for t in range(1, total + 1):
+        yield (t, f"{rnd.choice(MATERIAS)} - Turma {t}", professor_da_turma(t, professores),
+               1 if rnd.random() < 0.9 else 0)
+
+
+def gerar_alunos(rnd, total, turmas):
+    for a in range(1, total + 1):
+        idade = rnd.randint(17, 40)
+        nascimento = DATA_BASE - timedelta(days=idade * 365 + rnd.randint(0, 364))
+        yield (a, nome_aleatorio(rnd), idade, turma_do_aluno(a, turmas), nascimento.isoformat())
+
+
+def carregar(conn, sql, linhas, lote):
+    """Insere as linhas com executemany, numa transação a cada `lote` linhas."""
+    total = 0
+    while True:
+        bloco = list(islice(linhas, lote))
+        if not bloco:
+            return total
+        conn.exec_driver_sql(sql, bloco)
+        conn.commit()
+        total += len(bloco)
+
+
+def registrar_comando(app):
+    @app.cli.command('gerar-dados')
+    @click.option('--seed', default=42, show_default=True)
+    @click.option('--professores', default=100, show_default=True)
+    @click.option('--turmas', default=500, show_default=True)
+    @click.option('--alunos', default=20000, show_default=True)
+    @click.option('--atividades-por-turma', default=5, show_default=True, help='Usado pelo serviço de Atividades.')
+    @click.option('--reservas-por-turma', default=10, show_default=True, help='Usado pelo serviço de Reservas.')
+    @click.option('--lote', default=50000, show_default=True, help='Linhas por transação.')
+    @click.option('--limpar', is_flag=True, help='Apaga os dados existentes antes de gerar.')
+    def gerar_dados(seed, professores, turmas, alunos, atividades_por_turma, reservas_por_turma, lote, limpar):
+        """Gera professores, turmas e alunos sintéticos direto no banco SQLite."""
+        with db.engine.connect() as conn:
+            existentes = conn.exec_driver_sql("SELECT COUNT(*) FROM professor").scalar()
+            if existentes and not limpar:
+                raise click.ClickException('O banco já tem dados; use --limpar para substituí-los.')
+            conn.exec_driver_sql('PRAGMA synchronous = OFF')
+            if limpar:
+                for tabela in ('aluno', 'turma', 'professor'):
+                    conn.exec_driver_sql(f'DELETE FROM {tabela}')
+                conn.commit()
+
+            n = carregar(conn, 'INSERT INTO professor (id, nome, idade, materia, observacoes) VALUES (?, ?, ?, ?, ?)',
+                         gerar_professores(random.Random(seed * 10 + 1), professores), lote)
+            click.echo(f'{n} professores')
+            n = carregar(conn, 'INSERT INTO turma (id, descricao, professor_id, ativo) VALUES (?, ?, ?, ?)',
+                         gerar_turmas(random.Random(seed * 10 + 2), turmas, professores), lote)
+            click.echo(f'{n} turmas')
+            n = carregar(conn, 'INSERT INTO aluno (id, nome, idade, turma_id, data_nascimento) VALUES (?, ?, ?, ?, ?)',
+                         gerar_alunos(random.Random(seed * 10 + 3), alunos, turmas), lote)
+            click.echo(f'{n} alunos')
@@ -1,2 +1,24 @@
 from flask_sqlalchemy import SQLAlchemy
-db = SQLAlchemy()
+from sqlalchemy.schema import CreateIndex
+from flask_sqlalchemy.session import Session
+
+class Sessao(Session):
+    # Dentro de um /batch transacional o commit das rotas vira flush:
+    # os IDs são gerados, mas tudo só é gravado (ou desfeito) no fim do lote
+    def commit(self):
+        if self.info.get('adiar_commit'):
+            self.flush()
+            self.expire_all()  # como no commit, os objetos são relidos do banco
+        else:
+            super().commit()
+
+db = SQLAlchemy(session_options={'class_': Sessao})
+
+def criar_indices():
+    # O create_all só cria os índices junto com tabelas novas: bancos que já existiam
+    # recebem aqui os índices declarados depois (index=True) nos modelos
+    for bind_key, metadata in db.metadatas.items():
+        with db.engines[bind_key].begin() as conn:
+            for tabela in metadata.sorted_tables:
+                for indice in tabela.indexes:
+                    conn.execute(CreateIndex(indice, if_not_exists=True))
@@ -0,0 +1,159 @@
+"""Fila de tarefas em segundo plano, persistida na tabela `tarefa` do próprio banco SQLite.
+
+`enfileirar` só adiciona a tarefa à sessão: ela é gravada no mesmo commit da operação
+que a gerou. Threads (FILA_WORKERS) pegam as tarefas pendentes por ordem de criação,
+marcando cada uma com um UPDATE condicional, e executam a função registrada com
+`@tarefa(tipo)`. Se a função falhar, a tarefa volta para a fila com espera exponencial
+até FILA_MAX_TENTATIVAS tentativas; depois fica com estado 'falhou' até ser devolvida à
+fila com `flask reprocessar-tarefas`. Tarefas concluídas são apagadas. Ao iniciar, as
+tarefas que ficaram 'executando' (processo interrompido) voltam a ser pendentes, então as
+funções devem poder rodar mais de uma vez.
+"""
+import json
+import os
+import threading
+import time
+
+import click
+from flask import current_app, jsonify
+from sqlalchemy import delete, event, func, select, update
+
+from app.database import Sessao, db
+from app.models import Tarefa
+
+FILA_WORKERS = int(os.getenv('FILA_WORKERS', '2'))
+FILA_MAX_TENTATIVAS = int(os.getenv('FILA_MAX_TENTATIVAS', '12'))
+FILA_ESPERA_BASE = float(os.getenv('FILA_ESPERA_BASE', '2'))  # segundos; dobra a cada nova tentativa
+FILA_ESPERA_MAXIMA = 300
+FILA_INTERVALO = float(os.getenv('FILA_INTERVALO', '5'))  # sem aviso de tarefa nova, consulta a tabela nesse intervalo
+
+_tipos = {}
+_novas = threading.Event()
+_workers = {'iniciados': False}
+_lock = threading.Lock()
+
+
+def tarefa(tipo):
+    """Registra a função que executa as tarefas do tipo; ela recebe os dados como argumentos nomeados."""
+    def decorator(funcao):
+        _tipos[tipo] = funcao
+        return funcao
+    return decorator
+
+
+def enfileirar(tipo, **dados):
+    db.session.add(Tarefa(tipo=tipo, dados=json.dumps(dados), executar_em=time.time()))
+    db.session.info['fila_nova_tarefa'] = True
+
+
+@event.listens_for(Sessao, 'after_commit')
+def _avisar_workers(session):
+    if session.info.pop('fila_nova_tarefa', False):
+        _novas.set()
+
+
+def _proxima():
+    """Marca como 'executando' e devolve a tarefa pendente mais antiga, ou None."""
+    while True:
+        pendente = db.session.execute(
+            select(Tarefa.id, Tarefa.tipo, Tarefa.dados, Tarefa.tentativas)
+            .where(Tarefa.estado == 'pendente', Tarefa.executar_em <= time.time())
+            .order_by(Tarefa.id).limit(1)
+        ).first()
+        if pendente is None:
+            db.session.commit()
+            return None
+        marcada = db.session.execute(
+            # tentativas no WHERE: outra thread pode ter executado e devolvido a tarefa à fila nesse meio tempo
+            update(Tarefa).where(Tarefa.id == pendente.id, Tarefa.estado == 'pendente',
+                                 Tarefa.tentativas == pendente.tentativas)
+            .values(estado='executando', tentativas=Tarefa.tentativas + 1)
+        ).rowcount
+        db.session.commit()
+        if marcada:
+            return pendente
+
+
+def _executar(pendente):
+    try:
+        _tipos[pendente.tipo](**json.loads(pendente.dados))
+        db.session.execute(delete(Tarefa).where(Tarefa.id == pendente.id))
+        db.session.commit()
+    except Exception as e:
+        db.session.rollback()
+        tentativas = pendente.tentativas + 1
+        if tentativas >= FILA_MAX_TENTATIVAS:
+            valores = {'estado': 'falhou'}
+        else:
+            espera = min(FILA_ESPERA_BASE * 2 ** (tentativas - 1), FILA_ESPERA_MAXIMA)
+            valores = {'estado': 'pendente', 'executar_em': time.time() + espera}
+        db.session.execute(update(Tarefa).where(Tarefa.id == pendente.id)
+                           .values(erro=f"{type(e).__name__}: {e}", **valores))
+        db.session.commit()
+        current_app.logger.warning('Tarefa %s (%s) falhou na tentativa %s: %s', pendente.id, pendente.tipo, tentativas, e)
+
+
+def _worker(app):
+    while True:
+        with app.app_context():
+            try:
+                pendente = _proxima()
+                if pendente is not None:
+                    _executar(pendente)
+                    continue
+            except Exception:
+                db.session.rollback()
+                app.logger.exception('Erro ao processar a fila de tarefas')
+        if _novas.wait(FILA_INTERVALO):
+            _novas.clear()
+
+
+def iniciar(app):
+    """Inicia as threads da fila uma única vez por processo."""
+    with _lock:
+        if _workers['iniciados'] or FILA_WORKERS <= 0:
+            return
+        _workers['iniciados'] = True
+    with app.app_context():
+        db.session.execute(update(Tarefa).where(Tarefa.estado == 'executando').values(estado='pendente'))
+        db.session.commit()
+    for i in range(FILA_WORKERS):
+        threading.Thread(target=_worker, args=(app,), name=f'fila-{i + 1}', daemon=True).start()
+
+
+def instalar(app):
+    """Expõe /metricas/fila e inicia as threads na primeira requisição (ou ao chamar `iniciar`)."""
+    @app.route('/metricas/fila', methods=['GET'])
+    def metricas_fila():
+        """
+        Métricas da fila de tarefas
+        ---
+        tags: [Métricas]
+        responses:
+          200: { description: "Tarefas por estado e idade da pendente mais antiga" }
+        """
+        por_estado = dict(db.session.execute(select(Tarefa.estado, func.count()).group_by(Tarefa.estado)).all())
+        mais_antiga = db.session.execute(
+            select(func.min(Tarefa.executar_em)).where(Tarefa.estado == 'pendente')).scalar()
+        return jsonify({
+            'workers': FILA_WORKERS if _workers['iniciados'] else 0,
+            'pendentes': por_estado.get('pendente', 0),
+            'executando': por_estado.get('executando', 0),
+            'falhas': por_estado.get('falhou', 0),
+            'espera_mais_antiga_s': round(max(time.time() - mais_antiga, 0.0), 3) if mais_antiga else 0.0,
+        })
+
+    @app.before_request
+    def iniciar_fila():
+        if not _workers['iniciados']:
+            iniciar(app)
+
+
+def registrar_comando(app):
+    @app.cli.command('reprocessar-tarefas')
+    def reprocessar_tarefas():
+        """Devolve à fila as tarefas que falharam em todas as tentativas."""
+        n = db.session.execute(update(Tarefa).where(Tarefa.estado == 'falhou')
+                               .values(estado='pendente', tentativas=0, executar_em=time.time())).rowcount
+        db.session.commit()
+        click.echo(f"{n} tarefas devolvidas à fila")
@@ -0,0 +1,57 @@
+"""Negociação de conteúdo entre JSON e MessagePack.
+
+As respostas geradas com `jsonify` saem em MessagePack quando a requisição pede
+`Accept: application/msgpack`, e `request.get_json()` também lê corpos enviados com
+`Content-Type: application/msgpack`. Sem esses cabeçalhos tudo continua em JSON.
+"""
+import msgpack
+from flask import Request, has_request_context, request
+from flask.json.provider import DefaultJSONProvider
+
+JSON = 'application/json'
+MSGPACK = 'application/msgpack'
+
+# Accept usado nas chamadas entre serviços: MessagePack, com JSON como alternativa
+ACCEPT_INTERNO = f"{MSGPACK}, {JSON};q=0.9"
+
+
+def formato_resposta():
+    """Mimetype da resposta pedido no Accept da requisição atual (JSON se não houver preferência)."""
+    if not has_request_context():
+        return JSON
+    return request.accept_mimetypes.best_match([JSON, MSGPACK], default=JSON)
+
+
+class ProvedorJSON(DefaultJSONProvider):
+    def response(self, *args, **kwargs):
+        if formato_resposta() == MSGPACK:
+            obj = self._prepare_response_obj(args, kwargs)
+            resp = self._app.response_class(msgpack.packb(obj, default=self.default), mimetype=MSGPACK)
+        else:
+            resp = super().response(*args, **kwargs)
+        resp.vary.add('Accept')
+        return resp
+
+
+class Requisicao(Request):
+    def get_json(self, force=False, silent=False, cache=True):
+        if self.mimetype != MSGPACK:
+            return super().get_json(force=force, silent=silent, cache=cache)
+        try:
+            return msgpack.unpackb(self.get_data(cache=cache))
+        except (ValueError, msgpack.UnpackException) as e:
+            if silent:
+                return None
+            return self.on_json_loading_failed(e)
+
+
+def ler_resposta(resp):
+    """Decodifica a resposta de outro serviço (requests), em MessagePack ou JSON."""
+    if resp.headers.get('Content-Type', '').startswith(MSGPACK):
+        return msgpack.unpackb(resp.content)
+    return resp.json()
+
+
+def instalar(app):
+    app.json = ProvedorJSON(app)
+    app.request_class = Requisicao
@@ -0,0 +1,29 @@
+"""Avisa os outros serviços sobre turmas e alunos apagados, para removerem os registros ligados a eles.
+
+`agendar_limpeza` é chamada pelas rotas DELETE antes do commit, então o aviso é gravado na
+fila junto com a exclusão e o DELETE não espera pelos outros serviços. A tarefa faz o
+POST /limpeza/<recurso>/<id> no serviço e, se ele estiver fora do ar ou responder com erro,
+é repetida com espera crescente (ver app/fila.py).
+"""
+from app.fila import enfileirar, tarefa
+from app.servicos import ATIVIDADES_URL, RESERVAS_URL, TIMEOUT, sessao
+
+SERVICOS = {'atividades': ATIVIDADES_URL, 'reservas': RESERVAS_URL}
+# Serviços que guardam registros ligados a cada recurso do Gerenciamento
+DEPENDENTES = {'turmas': ['reservas', 'atividades'], 'alunos': ['atividades']}
+
+
+class LimpezaRecusada(Exception):
+    pass
+
+
+@tarefa('avisar_limpeza')
+def avisar_limpeza(servico, recurso, id):
+    resp = sessao.post(f"{SERVICOS[servico]}/limpeza/{recurso}/{id}", timeout=TIMEOUT)
+    if resp.status_code >= 300:
+        raise LimpezaRecusada(f"{servico} respondeu {resp.status_code}")
+
+
+def agendar_limpeza(recurso, id):
+    for servico in DEPENDENTES[recurso]:
+        enfileirar('avisar_limpeza', servico=servico, recurso=recurso, id=id)
@@ -11,7 +11,7 @@ class Professor(db.Model):
 class Turma(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     descricao = db.Column(db.String(100), nullable=False)
-    professor_id = db.Column(db.Integer, db.ForeignKey('professor.id'), nullable=False)
+    professor_id = db.Column(db.Integer, db.ForeignKey('professor.id'), nullable=False, index=True)
     ativo = db.Column(db.Boolean, default=True)
     alunos = db.relationship('Aluno', backref='turma', lazy=True)
 
@@ -19,5 +19,16 @@ class Aluno(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     nome = db.Column(db.String(100), nullable=False)
     idade = db.Column(db.Integer)
-    turma_id = db.Column(db.Integer, db.ForeignKey('turma.id'), nullable=False)
+    turma_id = db.Column(db.Integer, db.ForeignKey('turma.id'), nullable=False, index=True)
     data_nascimento = db.Column(db.Date)
+
+# Tarefas da fila em segundo plano (ver app/fila.py)
+class Tarefa(db.Model):
+    __table_args__ = (db.Index('ix_tarefa_estado_executar_em', 'estado', 'executar_em'),)
+    id = db.Column(db.Integer, primary_key=True)
+    tipo = db.Column(db.String(50), nullable=False)
+    dados = db.Column(db.Text, nullable=False)  # argumentos em JSON
+    estado = db.Column(db.String(20), nullable=False, default='pendente')
+    tentativas = db.Column(db.Integer, nullable=False, default=0)
+    executar_em = db.Column(db.Float, nullable=False)  # time.time() a partir do qual pode rodar
+    erro = db.Column(db.Text)
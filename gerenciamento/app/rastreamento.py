@@ -0,0 +1,239 @@
+"""Rastreamento distribuído com propagação W3C `traceparent`.
+
+Cada requisição recebida gera um span SERVER; cada comando SQL e cada chamada HTTP a
+outro serviço gera um span filho. Os spans amostrados são gravados, um por linha, em
+RASTREAMENTO_ARQUIVO no formato JSON v2 do Zipkin.
+
+A amostragem segue a decisão de quem chamou (flag do `traceparent`); quando a requisição
+não traz `traceparent`, ela é amostrada com probabilidade RASTREAMENTO_AMOSTRAGEM.
+"""
+import json
+import os
+import queue
+import random
+import re
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from urllib.parse import urlsplit
+
+import requests
+from flask import g, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+RASTREAMENTO_AMOSTRAGEM = float(os.getenv('RASTREAMENTO_AMOSTRAGEM', '0'))
+RASTREAMENTO_ARQUIVO = os.getenv('RASTREAMENTO_ARQUIVO', 'spans.ndjson')
+
+_TRACEPARENT = re.compile(r'^00-([0-9a-f]{32})-([0-9a-f]{16})-([0-9a-f]{2})$')
+_span_atual = ContextVar('span_atual', default=None)
+_servico = {'nome': 'desconhecido'}
+
+
+class Span:
+    __slots__ = ('trace_id', 'span_id', 'parent_id', 'nome', 'tipo', 'amostrado', 'timestamp', 'inicio', 'tags')
+
+    def __init__(self, trace_id, parent_id, nome, tipo, amostrado):
+        self.trace_id = trace_id
+        self.span_id = '%016x' % random.getrandbits(64)
+        self.parent_id = parent_id
+        self.nome = nome
+        self.tipo = tipo
+        self.amostrado = amostrado
+        self.timestamp = time.time()
+        self.inicio = time.perf_counter()
+        self.tags = {}
+
+    def traceparent(self):
+        return f"00-{self.trace_id}-{self.span_id}-{'01' if self.amostrado else '00'}"
+
+    def finalizar(self):
+        if not self.amostrado:
+            return
+        duracao = time.perf_counter() - self.inicio
+        registro = {
+            'traceId': self.trace_id,
+            'id': self.span_id,
+            'name': self.nome,
+            'timestamp': int(self.timestamp * 1_000_000),
+            'duration': max(int(duracao * 1_000_000), 1),
+            'localEndpoint': {'serviceName': _servico['nome']},
+            'tags': self.tags,
+        }
+        if self.parent_id:
+            registro['parentId'] = self.parent_id
+        if self.tipo:
+            registro['kind'] = self.tipo
+        exportador.exportar(registro)
+
+
+class ExportadorArquivo:
+    """Grava os spans numa thread separada, para não atrasar as requisições."""
+
+    def __init__(self, caminho):
+        self.caminho = caminho
+        self._fila = queue.SimpleQueue()
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def exportar(self, registro):
+        if self._thread is None:
+            with self._lock:
+                if self._thread is None:
+                    self._thread = threading.Thread(target=self._executar, name='exportador-spans', daemon=True)
+                    self._thread.start()
+        self._fila.put(registro)
+
+    def _executar(self):
+        with open(self.caminho, 'a', encoding='utf-8') as arquivo:
+            while True:
+                arquivo.write(json.dumps(self._fila.get(), ensure_ascii=False) + '\n')
+                if self._fila.empty():
+                    arquivo.flush()
+
+
+exportador = ExportadorArquivo(RASTREAMENTO_ARQUIVO)
+
+
+def _novo_trace_id():
+    return '%032x' % random.getrandbits(128)
+
+
+def _filho(nome, tipo):
+    pai = _span_atual.get()
+    if pai is None:
+        return Span(_novo_trace_id(), None, nome, tipo, random.random() < RASTREAMENTO_AMOSTRAGEM)
+    return Span(pai.trace_id, pai.span_id, nome, tipo, pai.amostrado)
+
+
+@contextmanager
+def span(nome, tipo=None):
+    """Mede um trecho de código como span filho do span atual."""
+    s = _filho(nome, tipo)
+    token = _span_atual.set(s)
+    try:
+        yield s
+    except Exception as e:
+        s.tags['error'] = type(e).__name__
+        raise
+    finally:
+        _span_atual.reset(token)
+        s.finalizar()
+
+
+class SessaoRastreada(requests.Session):
+    """requests.Session que registra um span CLIENT por chamada e envia o `traceparent`.
+
+    `timeout` vale para as chamadas que não informam o próprio.
+    """
+
+    def __init__(self, timeout=None):
+        super().__init__()
+        self.timeout = timeout
+
+    def request(self, method, url, *args, headers=None, **kwargs):
+        kwargs.setdefault('timeout', self.timeout)
+        with span(f"{method} {urlsplit(url).path}", 'CLIENT') as s:
+            s.tags['http.method'] = method
+            s.tags['http.url'] = url
+            headers = dict(headers or {})
+            headers['traceparent'] = s.traceparent()
+            resp = super().request(method, url, *args, headers=headers, **kwargs)
+            s.tags['http.status_code'] = str(resp.status_code)
+            return resp
+
+
+def acompanhar_resposta(resp):
+    """Passa o span SERVER da requisição para uma resposta em streaming.
+
+    O span continua sendo o atual enquanto o corpo é gerado (os comandos SQL e as
+    chamadas feitas ali ficam como filhos dele) e só termina quando o envio acaba.
+    """
+    s = g.pop('span', None)
+    if s is None:
+        return resp
+    s.tags['http.status_code'] = str(resp.status_code)
+    original = resp.response
+    corpo = iter(original)
+
+    def gerar():
+        # Reposto a cada bloco: entre um bloco e outro a thread pode ter atendido outra requisição
+        try:
+            while True:
+                _span_atual.set(s)
+                try:
+                    bloco = next(corpo)
+                except StopIteration:
+                    return
+                yield bloco
+        finally:
+            _span_atual.set(None)
+            if hasattr(original, 'close'):
+                original.close()
+
+    resp.response = gerar()
+    resp.call_on_close(s.finalizar)
+    return resp
+
+
+def _antes_sql(conn, cursor, statement, parameters, context, executemany):
+    pai = _span_atual.get()
+    if pai is not None and pai.amostrado:
+        s = Span(pai.trace_id, pai.span_id, f"SQL {statement.split(None, 1)[0]}", 'CLIENT', True)
+        s.tags['db.statement'] = statement[:500]
+        conn.info.setdefault('spans_sql', []).append(s)
+
+
+def _depois_sql(conn, cursor, statement, parameters, context, executemany):
+    spans = conn.info.get('spans_sql')
+    if spans:
+        spans.pop().finalizar()
+
+
+def _erro_sql(contexto):
+    # Comando que falhou não passa pelo after_cursor_execute: o span é fechado aqui,
+    # senão ficaria preso em conn.info na conexão devolvida ao pool
+    spans = contexto.connection.info.get('spans_sql') if contexto.connection is not None else None
+    if spans:
+        s = spans.pop()
+        s.tags['error'] = type(contexto.original_exception).__name__
+        s.finalizar()
+
+
+def instalar(app, nome_servico):
+    """Cria o span SERVER de cada requisição e liga o rastreamento dos comandos SQL."""
+    _servico['nome'] = nome_servico
+    if not event.contains(Engine, 'before_cursor_execute', _antes_sql):
+        event.listen(Engine, 'before_cursor_execute', _antes_sql)
+        event.listen(Engine, 'after_cursor_execute', _depois_sql)
+        event.listen(Engine, 'handle_error', _erro_sql)
+
+    @app.before_request
+    def iniciar_span():
+        m = _TRACEPARENT.match(request.headers.get('traceparent', ''))
+        if m and m.group(1) != '0' * 32 and m.group(2) != '0' * 16:
+            s = Span(m.group(1), m.group(2), '', 'SERVER', bool(int(m.group(3), 16) & 1))
+        else:
+            s = Span(_novo_trace_id(), None, '', 'SERVER', random.random() < RASTREAMENTO_AMOSTRAGEM)
+        s.nome = f"{request.method} {request.url_rule.rule if request.url_rule else request.path}"
+        s.tags['http.method'] = request.method
+        s.tags['http.path'] = request.path
+        _span_atual.set(s)
+        g.span = s
+
+    @app.after_request
+    def registrar_status(resp):
+        s = g.get('span')
+        if s is not None:
+            s.tags['http.status_code'] = str(resp.status_code)
+        return resp
+
+    @app.teardown_request
+    def finalizar_span(exc):
+        s = g.pop('span', None)
+        if s is not None:
+            if exc is not None:
+                s.tags['error'] = type(exc).__name__
+            _span_atual.set(None)
+            s.finalizar()
@@ -1,18 +1,113 @@
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, Response, request, jsonify
+from app.database import Sessao
 from app.models import db, Aluno, Professor, Turma
+from app.busca import LIMITE_MAXIMO, LIMITE_PADRAO, buscar_ids
+from app.cache import CacheLRU, CacheTTL
+from app.formato import JSON, MSGPACK, formato_resposta
+from app.limpeza import agendar_limpeza
+from app.listas import responder_lista
+from app.servicos import ATIVIDADES_URL, RESERVAS_URL, ServicoIndisponivel, buscar_json
+from sqlalchemy import event
+from sqlalchemy.orm import load_only, selectinload
+from concurrent.futures import ThreadPoolExecutor
+from contextvars import copy_context
 from datetime import datetime
+import os
 
 gerenciamento_bp = Blueprint('gerenciamento', __name__)
 
-# Helper para converter objeto para dicionário
-def to_dict(obj):
+painel_cache = CacheTTL(float(os.getenv('PAINEL_CACHE_TTL', '5')))
+detalhe_cache = CacheLRU(int(os.getenv('DETALHE_CACHE_BYTES', str(8 * 1024 * 1024))))
+_executor = ThreadPoolExecutor(max_workers=int(os.getenv('SERVICOS_POOL', '16')))
+
+# Helper para converter objeto para dicionário (opcionalmente só com alguns campos)
+def to_dict(obj, campos=None):
     if obj is None:
         return None
-    d = {c.name: getattr(obj, c.name) for c in obj.__table__.columns}
+    nomes = campos or [c.name for c in obj.__table__.columns]
+    d = {n: getattr(obj, n) for n in nomes}
     if 'data_nascimento' in d and d['data_nascimento']:
         d['data_nascimento'] = d['data_nascimento'].isoformat()
     return d
 
+# Helper para ?fields=a,b: devolve (campos, erro); campos é None quando todos foram pedidos
+def campos_solicitados(model):
+    fields = request.args.get('fields')
+    if not fields:
+        return None, None
+    campos = [f.strip() for f in fields.split(',') if f.strip()]
+    invalidos = [c for c in campos if c not in model.__table__.columns]
+    if invalidos:
+        return None, (jsonify({'erro': f"Campos inválidos: {', '.join(invalidos)}"}), 400)
+    return campos, None
+
+# Restringe o SELECT às colunas pedidas, para não ler colunas grandes sem necessidade
+def com_campos(query, model, campos):
+    if campos:
+        query = query.options(load_only(*[getattr(model, c) for c in campos]))
+    return query
+
+# Helper para ?ids=1,2,3 (validação em lote pelos outros serviços): devolve (query, erro)
+def filtrar_ids(query, model):
+    if not request.args.get('ids'):
+        return query, None
+    try:
+        ids = [int(i) for i in request.args['ids'].split(',') if i.strip()]
+    except ValueError:
+        return None, (jsonify({'erro': 'Parâmetro ids inválido'}), 400)
+    return query.filter(model.id.in_(ids)), None
+
+# Cache das respostas de GET /<entidade>/<id> sem parâmetros (as chamadas de validação
+# dos outros serviços), guardadas por formato; devolve a resposta guardada ou None
+def detalhe_em_cache(chave):
+    if request.args:
+        return None
+    formato = formato_resposta()
+    corpo = detalhe_cache.get((formato, *chave))
+    if corpo is None:
+        return None
+    resp = Response(corpo, mimetype=formato)
+    resp.vary.add('Accept')
+    return resp
+
+def responder_detalhe(chave, obj, campos, geracao):
+    resp = jsonify(to_dict(obj, campos))
+    # Dentro de um /batch transacional o dado ainda pode ser desfeito; não guarda
+    if not request.args and not db.session.info.get('adiar_commit'):
+        detalhe_cache.set((resp.mimetype, *chave), resp.get_data(), geracao)
+    return resp
+
+def _invalidar(chave):
+    for formato in (JSON, MSGPACK):
+        detalhe_cache.invalidar((formato, *chave))
+
+# Chamado pelos PUT/DELETE depois do commit
+def invalidar_detalhe(chave):
+    _invalidar(chave)
+    if db.session.info.get('adiar_commit'):
+        # /batch transacional: invalida de novo quando o lote for de fato gravado
+        db.session.info.setdefault('invalidar_detalhe', set()).add(chave)
+
+@event.listens_for(Sessao, 'after_commit')
+def _invalidar_pendentes(session):
+    for chave in session.info.pop('invalidar_detalhe', ()):
+        _invalidar(chave)
+
+# Busca por nome no índice FTS5 e devolve os registros na ordem de relevância
+def buscar_por_nome(model):
+    q = request.args.get('q', '').strip()
+    if not q:
+        return jsonify({'erro': 'Parâmetro q obrigatório'}), 400
+    limite = min(max(request.args.get('limite', LIMITE_PADRAO, type=int), 1), LIMITE_MAXIMO)
+    campos, erro = campos_solicitados(model)
+    if erro:
+        return erro
+    ids = buscar_ids(db.session, model.__tablename__, q, limite)
+    if not ids:
+        return jsonify([])
+    por_id = {o.id: o for o in com_campos(model.query, model, campos).filter(model.id.in_(ids))}
+    return jsonify([to_dict(por_id[i], campos) for i in ids if i in por_id])
+
 # === CRUD PROFESSOR ===
 @gerenciamento_bp.route('/professores', methods=['POST'])
 def criar_professor():
@@ -53,11 +148,37 @@ def listar_professores():
     Listar todos os professores
     ---
     tags: [Professores]
+    parameters:
+      - { name: ids, in: query, type: string, required: false, description: "Buscar apenas estes IDs, separados por vírgula" }
+      - { name: fields, in: query, type: string, required: false, description: "Campos a retornar, separados por vírgula" }
     responses:
       200: { description: "Lista de professores" }
+      400: { description: "Campos ou IDs inválidos" }
+    """
+    campos, erro = campos_solicitados(Professor)
+    if erro:
+        return erro
+    query, erro = filtrar_ids(com_campos(Professor.query, Professor, campos), Professor)
+    if erro:
+        return erro
+    return responder_lista(query, Professor.id, lambda p: to_dict(p, campos))
+
+@gerenciamento_bp.route('/professores/busca', methods=['GET'])
+def buscar_professores():
+    """
+    Buscar professores pelo nome
+    ---
+    tags: [Professores]
+    description: Busca de texto completo (FTS5). Cada palavra casa por prefixo e acentos são ignorados; os resultados vêm ordenados por relevância.
+    parameters:
+      - { name: q, in: query, type: string, required: true, description: "Texto a buscar, ex.: 'mar sil'" }
+      - { name: limite, in: query, type: integer, required: false, description: "Máximo de resultados (padrão 20, máximo 100)" }
+      - { name: fields, in: query, type: string, required: false, description: "Campos a retornar, separados por vírgula" }
+    responses:
+      200: { description: "Professores encontrados" }
+      400: { description: "Parâmetro q ausente ou campos inválidos" }
     """
-    professores = [to_dict(p) for p in Professor.query.all()]
-    return jsonify(professores)
+    return buscar_por_nome(Professor)
 
 @gerenciamento_bp.route('/professores/<int:id>', methods=['GET'])
 def obter_professor(id):
@@ -67,14 +188,23 @@ def obter_professor(id):
     tags: [Professores]
     parameters:
       - { name: id, in: path, type: integer, required: true }
+      - { name: fields, in: query, type: string, required: false, description: "Campos a retornar, separados por vírgula" }
     responses:
       200: { description: "Dados do professor" }
+      400: { description: "Campos inválidos" }
       404: { description: "Professor não encontrado" }
     """
-    prof = Professor.query.get(id)
+    em_cache = detalhe_em_cache(('professor', id))
+    if em_cache is not None:
+        return em_cache
+    campos, erro = campos_solicitados(Professor)
+    if erro:
+        return erro
+    geracao = detalhe_cache.geracao()
+    prof = com_campos(Professor.query, Professor, campos).get(id)
     if not prof:
         return jsonify({'erro': 'Professor não encontrado'}), 404
-    return jsonify(to_dict(prof))
+    return responder_detalhe(('professor', id), prof, campos, geracao)
 
 @gerenciamento_bp.route('/professores/<int:id>', methods=['PUT'])
 def atualizar_professor(id):
@@ -107,6 +237,7 @@ def atualizar_professor(id):
     prof.materia = data.get('materia', prof.materia)
     prof.observacoes = data.get('observacoes', prof.observacoes)
     db.session.commit()
+    invalidar_detalhe(('professor', id))
     return jsonify(to_dict(prof))
 
 @gerenciamento_bp.route('/professores/<int:id>', methods=['DELETE'])
@@ -126,8 +257,39 @@ def deletar_professor(id):
         return jsonify({'erro': 'Professor não encontrado'}), 404
     db.session.delete(prof)
     db.session.commit()
+    invalidar_detalhe(('professor', id))
     return jsonify({'mensagem': 'Professor deletado com sucesso'})
 
+@gerenciamento_bp.route('/professores/<int:id>/turmas', methods=['GET'])
+def listar_turmas_por_professor(id):
+    """
+    Listar as turmas de um professor
+    ---
+    tags: [Professores]
+    parameters:
+      - { name: id, in: path, type: integer, required: true, description: "ID do Professor" }
+      - { name: incluir, in: query, type: string, required: false, description: "Use 'alunos' para incluir os alunos de cada turma" }
+    responses:
+      200: { description: "Lista de turmas do professor" }
+      404: { description: "Professor não encontrado" }
+    """
+    if not Professor.query.get(id):
+        return jsonify({'erro': 'Professor não encontrado'}), 404
+
+    query = Turma.query.filter_by(professor_id=id).order_by(Turma.id)
+    incluir_alunos = 'alunos' in request.args.get('incluir', '').split(',')
+    if incluir_alunos:
+        # Carrega os alunos de todas as turmas numa única consulta (IN), evitando N+1
+        query = query.options(selectinload(Turma.alunos))
+
+    turmas = []
+    for t in query.all():
+        d = to_dict(t)
+        if incluir_alunos:
+            d['alunos'] = [to_dict(a) for a in sorted(t.alunos, key=lambda a: a.id)]
+        turmas.append(d)
+    return jsonify(turmas)
+
 # === CRUD TURMA ===
 @gerenciamento_bp.route('/turmas', methods=['POST'])
 def criar_turma():
@@ -168,11 +330,20 @@ def listar_turmas():
     Listar todas as turmas
     ---
     tags: [Turmas]
+    parameters:
+      - { name: ids, in: query, type: string, required: false, description: "Buscar apenas estes IDs, separados por vírgula" }
+      - { name: fields, in: query, type: string, required: false, description: "Campos a retornar, separados por vírgula" }
     responses:
       200: { description: "Lista de turmas" }
+      400: { description: "Campos ou IDs inválidos" }
     """
-    turmas = [to_dict(t) for t in Turma.query.all()]
-    return jsonify(turmas)
+    campos, erro = campos_solicitados(Turma)
+    if erro:
+        return erro
+    query, erro = filtrar_ids(com_campos(Turma.query, Turma, campos), Turma)
+    if erro:
+        return erro
+    return responder_lista(query, Turma.id, lambda t: to_dict(t, campos))
 
 @gerenciamento_bp.route('/turmas/<int:id>', methods=['GET'])
 def obter_turma(id):
@@ -182,14 +353,23 @@ def obter_turma(id):
     tags: [Turmas]
     parameters:
       - { name: id, in: path, type: integer, required: true }
+      - { name: fields, in: query, type: string, required: false, description: "Campos a retornar, separados por vírgula" }
     responses:
       200: { description: "Dados da turma" }
+      400: { description: "Campos inválidos" }
       404: { description: "Turma não encontrada" }
     """
-    turma = Turma.query.get(id)
+    em_cache = detalhe_em_cache(('turma', id))
+    if em_cache is not None:
+        return em_cache
+    campos, erro = campos_solicitados(Turma)
+    if erro:
+        return erro
+    geracao = detalhe_cache.geracao()
+    turma = com_campos(Turma.query, Turma, campos).get(id)
     if not turma:
         return jsonify({'erro': 'Turma não encontrada'}), 404
-    return jsonify(to_dict(turma))
+    return responder_detalhe(('turma', id), turma, campos, geracao)
 
 @gerenciamento_bp.route('/turmas/<int:id>', methods=['PUT'])
 def atualizar_turma(id):
@@ -222,6 +402,7 @@ def atualizar_turma(id):
     turma.professor_id = data.get('professor_id', turma.professor_id)
     turma.ativo = data.get('ativo', turma.ativo)
     db.session.commit()
+    invalidar_detalhe(('turma', id))
     return jsonify(to_dict(turma))
 
 @gerenciamento_bp.route('/turmas/<int:id>', methods=['DELETE'])
@@ -240,9 +421,88 @@ def deletar_turma(id):
     if not turma:
         return jsonify({'erro': 'Turma não encontrada'}), 404
     db.session.delete(turma)
+    agendar_limpeza('turmas', id)
     db.session.commit()
+    invalidar_detalhe(('turma', id))
     return jsonify({'mensagem': 'Turma deletada com sucesso'})
 
+@gerenciamento_bp.route('/turmas/<int:id>/alunos', methods=['GET'])
+def listar_alunos_por_turma(id):
+    """
+    Listar os alunos de uma turma
+    ---
+    tags: [Turmas]
+    parameters:
+      - { name: id, in: path, type: integer, required: true, description: "ID da Turma" }
+      - { name: fields, in: query, type: string, required: false, description: "Campos a retornar, separados por vírgula" }
+    responses:
+      200: { description: "Lista de alunos da turma" }
+      400: { description: "Campos inválidos" }
+      404: { description: "Turma não encontrada" }
+    """
+    campos, erro = campos_solicitados(Aluno)
+    if erro:
+        return erro
+    if not Turma.query.get(id):
+        return jsonify({'erro': 'Turma não encontrada'}), 404
+
+    query = com_campos(Aluno.query.filter_by(turma_id=id).order_by(Aluno.id), Aluno, campos)
+    alunos = [to_dict(a, campos) for a in query]
+    return jsonify(alunos)
+
+@gerenciamento_bp.route('/turmas/<int:id>/painel', methods=['GET'])
+def obter_painel_turma(id):
+    """
+    Painel completo de uma turma (professor, alunos, atividades, notas e reservas)
+    ---
+    tags: [Turmas]
+    description: Agrega numa única resposta os dados da turma e dos serviços de Atividades e Reservas, consultados em paralelo. O resultado fica em cache por PAINEL_CACHE_TTL segundos.
+    parameters:
+      - { name: id, in: path, type: integer, required: true, description: "ID da Turma" }
+    responses:
+      200: { description: "Painel da turma" }
+      404: { description: "Turma não encontrada" }
+      502: { description: "Serviço de Atividades ou Reservas indisponível" }
+    """
+    painel = painel_cache.get(id)
+    if painel is not None:
+        return jsonify(painel)
+
+    turma = Turma.query.get(id)
+    if not turma:
+        return jsonify({'erro': 'Turma não encontrada'}), 404
+
+    # Dispara as chamadas aos outros serviços antes de consultar o banco local;
+    # copy_context mantém o span atual (rastreamento) dentro das threads
+    params = {'turma_id': id}
+    futuros = {
+        'atividades': _executor.submit(copy_context().run, buscar_json, f"{ATIVIDADES_URL}/atividades", params),
+        'notas': _executor.submit(copy_context().run, buscar_json, f"{ATIVIDADES_URL}/notas", params),
+        'reservas': _executor.submit(copy_context().run, buscar_json, f"{RESERVAS_URL}/reservas", params),
+    }
+
+    painel = to_dict(turma)
+    painel['professor'] = to_dict(Professor.query.get(turma.professor_id))
+    painel['alunos'] = [to_dict(a) for a in Aluno.query.filter_by(turma_id=id).order_by(Aluno.id)]
+
+    try:
+        atividades = futuros['atividades'].result()
+        notas = futuros['notas'].result()
+        reservas = futuros['reservas'].result()
+    except ServicoIndisponivel as e:
+        return jsonify({'erro': f'Serviço indisponível: {e}'}), 502
+
+    notas_por_atividade = {}
+    for n in notas:
+        notas_por_atividade.setdefault(n['atividade_id'], []).append(n)
+    for a in atividades:
+        a['notas'] = notas_por_atividade.get(a['id'], [])
+    painel['atividades'] = atividades
+    painel['reservas'] = reservas
+
+    painel_cache.set(id, painel)
+    return jsonify(painel)
+
 # === CRUD ALUNO ===
 @gerenciamento_bp.route('/alunos', methods=['POST'])
 def criar_aluno():
@@ -286,11 +546,37 @@ def listar_alunos():
     Listar todos os alunos
     ---
     tags: [Alunos]
+    parameters:
+      - { name: ids, in: query, type: string, required: false, description: "Buscar apenas estes IDs, separados por vírgula" }
+      - { name: fields, in: query, type: string, required: false, description: "Campos a retornar, separados por vírgula" }
     responses:
       200: { description: "Lista de alunos" }
+      400: { description: "Campos ou IDs inválidos" }
     """
-    alunos = [to_dict(a) for a in Aluno.query.all()]
-    return jsonify(alunos)
+    campos, erro = campos_solicitados(Aluno)
+    if erro:
+        return erro
+    query, erro = filtrar_ids(com_campos(Aluno.query, Aluno, campos), Aluno)
+    if erro:
+        return erro
+    return responder_lista(query, Aluno.id, lambda a: to_dict(a, campos))
+
+@gerenciamento_bp.route('/alunos/busca', methods=['GET'])
+def buscar_alunos():
+    """
+    Buscar alunos pelo nome
+    ---
+    tags: [Alunos]
+    description: Busca de texto completo (FTS5). Cada palavra casa por prefixo e acentos são ignorados; os resultados vêm ordenados por relevância.
+    parameters:
+      - { name: q, in: query, type: string, required: true, description: "Texto a buscar, ex.: 'mar sil'" }
+      - { name: limite, in: query, type: integer, required: false, description: "Máximo de resultados (padrão 20, máximo 100)" }
+      - { name: fields, in: query, type: string, required: false, description: "Campos a retornar, separados por vírgula" }
+    responses:
+      200: { description: "Alunos encontrados" }
+      400: { description: "Parâmetro q ausente ou campos inválidos" }
+    """
+    return buscar_por_nome(Aluno)
 
 @gerenciamento_bp.route('/alunos/<int:id>', methods=['GET'])
 def obter_aluno(id):
@@ -300,14 +586,23 @@ def obter_aluno(id):
     tags: [Alunos]
     parameters:
       - { name: id, in: path, type: integer, required: true }
+      - { name: fields, in: query, type: string, required: false, description: "Campos a retornar, separados por vírgula" }
     responses:
       200: { description: "Dados do aluno" }
+      400: { description: "Campos inválidos" }
       404: { description: "Aluno não encontrado" }
     """
-    aluno = Aluno.query.get(id)
+    em_cache = detalhe_em_cache(('aluno', id))
+    if em_cache is not None:
+        return em_cache
+    campos, erro = campos_solicitados(Aluno)
+    if erro:
+        return erro
+    geracao = detalhe_cache.geracao()
+    aluno = com_campos(Aluno.query, Aluno, campos).get(id)
     if not aluno:
         return jsonify({'erro': 'Aluno não encontrado'}), 404
-    return jsonify(to_dict(aluno))
+    return responder_detalhe(('aluno', id), aluno, campos, geracao)
 
 @gerenciamento_bp.route('/alunos/<int:id>', methods=['PUT'])
 def atualizar_aluno(id):
@@ -345,6 +640,7 @@ def atualizar_aluno(id):
         aluno.data_nascimento = datetime.fromisoformat(data['data_nascimento']).date() if data.get('data_nascimento') else None
 
     db.session.commit()
+    invalidar_detalhe(('aluno', id))
     return jsonify(to_dict(aluno))
 
 @gerenciamento_bp.route('/alunos/<int:id>', methods=['DELETE'])
@@ -363,5 +659,19 @@ def deletar_aluno(id):
     if not aluno:
         return jsonify({'erro': 'Aluno não encontrado'}), 404
     db.session.delete(aluno)
+    agendar_limpeza('alunos', id)
     db.session.commit()
+    invalidar_detalhe(('aluno', id))
     return jsonify({'mensagem': 'Aluno deletado com sucesso'})
+
+@gerenciamento_bp.route('/metricas/cache', methods=['GET'])
+def metricas_cache():
+    """
+    Métricas do cache de detalhes
+    ---
+    tags: [Métricas]
+    description: Cache das respostas de GET /professores/{id}, /turmas/{id} e /alunos/{id} sem parâmetros.
+    responses:
+      200: { description: "Entradas, bytes ocupados, acertos, falhas, taxa de acerto e descartes" }
+    """
+    return jsonify(detalhe_cache.metricas())
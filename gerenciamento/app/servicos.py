@@ -0,0 +1,31 @@
+import os
+import requests
+from requests.adapters import HTTPAdapter
+from app.formato import ACCEPT_INTERNO, ler_resposta
+from app.rastreamento import SessaoRastreada
+
+ATIVIDADES_URL = os.getenv('ATIVIDADES_URL', 'http://atividades:5000')
+RESERVAS_URL = os.getenv('RESERVAS_URL', 'http://reservas:5000')
+TIMEOUT = float(os.getenv('SERVICOS_TIMEOUT', '5'))
+
+# Sessão compartilhada: reaproveita conexões TCP (keep-alive) entre as chamadas
+sessao = SessaoRastreada(timeout=TIMEOUT)
+sessao.headers['Accept'] = ACCEPT_INTERNO  # prefere MessagePack, aceita JSON
+_adapter = HTTPAdapter(pool_connections=4, pool_maxsize=int(os.getenv('SERVICOS_POOL', '16')))
+sessao.mount('http://', _adapter)
+sessao.mount('https://', _adapter)
+
+
+class ServicoIndisponivel(Exception):
+    pass
+
+
+def buscar_json(url, params=None):
+    """Faz um GET em outro serviço e devolve o JSON, ou levanta ServicoIndisponivel."""
+    try:
+        resp = sessao.get(url, params=params, timeout=TIMEOUT)
+    except requests.RequestException as e:
+        raise ServicoIndisponivel(url) from e
+    if resp.status_code != 200:
+        raise ServicoIndisponivel(url)
+    return ler_resposta(resp)
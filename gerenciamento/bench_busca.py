@@ -0,0 +1,78 @@
+"""Compara a busca por nome via FTS5 com um LIKE '%...%' sobre a tabela aluno.
+
+Para cada consulta mostra o tempo médio e quantos resultados cada abordagem achou.
+O LIKE não ordena por relevância nem ignora acentos, e só é rápido quando muitas
+linhas casam logo no começo da tabela; termos seletivos obrigam a varrer tudo.
+
+Uso: python bench_busca.py [--alunos 500000] [--repeticoes 20]
+"""
+import argparse
+import os
+import random
+import tempfile
+import time
+
+from sqlalchemy import create_engine, text
+
+from app.busca import buscar_ids, criar_indices_busca
+from app.dados_sinteticos import nome_aleatorio
+from app.models import db
+
+CONSULTAS = ['mar', 'silva', 'rafa rib', 'natalia andrade rocha', 'otavio lop fer', 'xavier']
+
+
+def popular(conn, total, rnd):
+    conn.execute(text("INSERT INTO professor (id, nome) VALUES (1, 'Professor')"))
+    conn.execute(text("INSERT INTO turma (id, descricao, professor_id, ativo) VALUES (1, 'Turma', 1, 1)"))
+    lote = 10000
+    for inicio in range(1, total + 1, lote):
+        linhas = [
+            {'id': i, 'nome': nome_aleatorio(rnd)}
+            for i in range(inicio, min(inicio + lote, total + 1))
+        ]
+        conn.execute(text("INSERT INTO aluno (id, nome, turma_id) VALUES (:id, :nome, 1)"), linhas)
+
+
+def buscar_like(conn, q, limite):
+    # Equivalente ao que se faz hoje: varrer a tabela procurando cada palavra
+    filtros = ' AND '.join(f"nome LIKE :t{i}" for i, _ in enumerate(q.split()))
+    params = {f"t{i}": f"%{t}%" for i, t in enumerate(q.split())}
+    params['limite'] = limite
+    return [r[0] for r in conn.execute(text(f"SELECT id FROM aluno WHERE {filtros} LIMIT :limite"), params)]
+
+
+def medir(funcao, repeticoes):
+    """Devolve (ms por execução, quantidade de resultados)."""
+    inicio = time.perf_counter()
+    for _ in range(repeticoes):
+        resultado = funcao()
+    return (time.perf_counter() - inicio) / repeticoes * 1000, len(resultado)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--alunos', type=int, default=500000)
+    parser.add_argument('--repeticoes', type=int, default=20)
+    parser.add_argument('--limite', type=int, default=20)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as pasta:
+        engine = create_engine(f"sqlite:///{os.path.join(pasta, 'bench.db')}")
+        db.metadata.create_all(engine)
+        with engine.begin() as conn:
+            criar_indices_busca(conn)
+            inicio = time.perf_counter()
+            popular(conn, args.alunos, random.Random(42))
+            print(f"{args.alunos} alunos inseridos (com indexação FTS5) em {time.perf_counter() - inicio:.1f}s")
+
+        print(f"{'consulta':<24}{'LIKE ms':>10}{'achou':>7}{'FTS5 ms':>10}{'achou':>7}")
+        with engine.connect() as conn:
+            for q in CONSULTAS:
+                like_ms, like_n = medir(lambda: buscar_like(conn, q, args.limite), args.repeticoes)
+                fts_ms, fts_n = medir(lambda: buscar_ids(conn, 'aluno', q, args.limite), args.repeticoes)
+                print(f"{q:<24}{like_ms:>10.2f}{like_n:>7}{fts_ms:>10.2f}{fts_n:>7}")
+        engine.dispose()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,56 @@
+"""Compara JSON e MessagePack para listas grandes de alunos, como as de GET /alunos.
+
+Para cada tamanho de lista mostra o tamanho do corpo e o tempo médio para codificar
+(o que o serviço faz no jsonify) e decodificar (o que o cliente faz ao ler a resposta).
+O JSON é gerado pelo mesmo provedor do Flask usado nas rotas, no formato compacto do jsonify.
+
+Uso: python bench_formato.py [--tamanhos 1000 10000 100000] [--repeticoes 10]
+"""
+import argparse
+import random
+import time
+
+import msgpack
+from flask import Flask
+from flask.json.provider import DefaultJSONProvider
+
+from app.dados_sinteticos import gerar_alunos
+
+
+def alunos(total):
+    return [
+        {'id': i, 'nome': nome, 'idade': idade, 'turma_id': turma_id, 'data_nascimento': nascimento}
+        for i, nome, idade, turma_id, nascimento in gerar_alunos(random.Random(42), total, 500)
+    ]
+
+
+def medir(funcao, repeticoes):
+    """Devolve (ms por execução, resultado da última execução)."""
+    inicio = time.perf_counter()
+    for _ in range(repeticoes):
+        resultado = funcao()
+    return (time.perf_counter() - inicio) / repeticoes * 1000, resultado
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--tamanhos', type=int, nargs='+', default=[1000, 10000, 100000])
+    parser.add_argument('--repeticoes', type=int, default=10)
+    args = parser.parse_args()
+
+    provedor = DefaultJSONProvider(Flask(__name__))
+    print(f"{'alunos':>8}{'formato':>10}{'bytes':>12}{'codificar ms':>15}{'decodificar ms':>17}")
+    for total in args.tamanhos:
+        dados = alunos(total)
+        for nome, codificar, decodificar in [
+            ('json', lambda: provedor.dumps(dados, separators=(',', ':')).encode(), provedor.loads),
+            ('msgpack', lambda: msgpack.packb(dados), msgpack.unpackb),
+        ]:
+            cod_ms, corpo = medir(codificar, args.repeticoes)
+            dec_ms, lido = medir(lambda: decodificar(corpo), args.repeticoes)
+            assert lido == dados
+            print(f"{total:>8}{nome:>10}{len(corpo):>12}{cod_ms:>15.2f}{dec_ms:>17.2f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -1,6 +1,8 @@
 from app import create_app
+from app.fila import iniciar as iniciar_fila
 
 app = create_app()
 
 if __name__ == '__main__':
+    iniciar_fila(app)  # processa as tarefas pendentes mesmo antes da primeira requisição
     app.run(host='0.0.0.0', port=5000)
@@ -0,0 +1,171 @@
+import os
+from datetime import datetime
+
+import click
+from flask import jsonify, request
+from sqlalchemy import delete, func, insert, select
+from sqlalchemy.schema import CreateTable
+
+from app.database import db
+from app.models import Reserva, ReservaArquivada
+from app.routes import reservas_bp
+
+ARQUIVO_LOTE = int(os.getenv('ARQUIVO_LOTE', '1000'))
+
+
+class ColisaoArquivo(Exception):
+    """Já existe no arquivo um registro com o mesmo id e conteúdo diferente."""
+
+
+def _copiar(destino, linhas):
+    """Copia as linhas para o arquivo sem sobrescrever nada que já esteja lá.
+
+    Uma cópia idêntica já arquivada (execução anterior interrompida antes de apagar
+    as originais) é aceita; um id repetido com outro conteúdo é uma colisão.
+    """
+    copias = [dict(l) for l in linhas]
+    db.session.execute(insert(destino).prefix_with('OR IGNORE'), copias)
+    # Um SELECT de tabela não é roteado pelo bind_key; a tabela indica o banco de arquivo
+    arquivadas = {
+        l['id']: dict(l) for l in db.session.execute(
+            select(destino).where(destino.c.id.in_([c['id'] for c in copias])),
+            bind_arguments={'clause': destino},
+        ).mappings()
+    }
+    divergentes = [c['id'] for c in copias if arquivadas[c['id']] != c]
+    if divergentes:
+        db.session.rollback()
+        raise ColisaoArquivo(
+            f"{destino.name}: ids {', '.join(map(str, divergentes))} já arquivados com outro conteúdo"
+        )
+
+
+def _recriar_com_autoincrement(conn, tabela):
+    """Recria uma tabela criada sem AUTOINCREMENT, preservando linhas e índices."""
+    nova = f'{tabela.name}_nova'
+    ddl = str(CreateTable(tabela).compile(dialect=conn.dialect))
+    conn.exec_driver_sql(ddl.replace(f'CREATE TABLE {tabela.name} (', f'CREATE TABLE {nova} (', 1))
+    colunas = ', '.join(c.name for c in tabela.columns)
+    conn.exec_driver_sql(f'INSERT INTO {nova} ({colunas}) SELECT {colunas} FROM {tabela.name}')
+    conn.exec_driver_sql(f'DROP TABLE {tabela.name}')
+    conn.exec_driver_sql(f'ALTER TABLE {nova} RENAME TO {tabela.name}')
+    for indice in tabela.indexes:
+        indice.create(conn)
+
+
+def _maior_id_arquivado(arquivada):
+    with db.engines['arquivo'].connect() as conn_arquivo:
+        return conn_arquivo.execute(select(func.max(arquivada.c.id))).scalar() or 0
+
+
+def ultimo_id_usado(conn, tabela, arquivada):
+    """Maior id que `tabela` já usou, contando os registros apagados e os movidos para o arquivo."""
+    seq = conn.exec_driver_sql('SELECT seq FROM sqlite_sequence WHERE name = ?', (tabela.name,)).scalar()
+    atual = conn.execute(select(func.max(tabela.c.id))).scalar()
+    return max(seq or 0, atual or 0, _maior_id_arquivado(arquivada))
+
+
+def _reservar_ids(tabelas):
+    """Garante que nenhum id já arquivado volte a ser gerado.
+
+    Bancos criados antes do AUTOINCREMENT são migrados; depois a sequência de cada
+    tabela é avançada até o maior id presente no arquivo.
+    """
+    with db.engine.begin() as conn:
+        for tabela, arquivada in tabelas:
+            ddl = conn.exec_driver_sql(
+                "SELECT sql FROM sqlite_master WHERE type = 'table' AND name = ?", (tabela.name,)
+            ).scalar()
+            if 'AUTOINCREMENT' not in ddl.upper():
+                _recriar_com_autoincrement(conn, tabela)
+            maximo = _maior_id_arquivado(arquivada)
+            seq = conn.exec_driver_sql(
+                'SELECT seq FROM sqlite_sequence WHERE name = ?', (tabela.name,)
+            ).scalar()
+            if seq is None:
+                if maximo:
+                    conn.exec_driver_sql('INSERT INTO sqlite_sequence (name, seq) VALUES (?, ?)', (tabela.name, maximo))
+            elif seq < maximo:
+                conn.exec_driver_sql('UPDATE sqlite_sequence SET seq = ? WHERE name = ?', (maximo, tabela.name))
+
+
+def preparar_ids():
+    _reservar_ids([(Reserva.__table__, ReservaArquivada.__table__)])
+
+
+def arquivar(antes_de, tamanho_lote=ARQUIVO_LOTE):
+    """Move as reservas com data anterior a `antes_de` para o banco de arquivo, em lotes."""
+    origem = Reserva.__table__
+    destino = ReservaArquivada.__table__
+    total = 0
+    while True:
+        linhas = db.session.execute(
+            select(origem).where(origem.c.data < antes_de).order_by(origem.c.id).limit(tamanho_lote)
+        ).mappings().all()
+        if not linhas:
+            return total
+        # Grava primeiro no arquivo; se o processo parar antes de apagar as originais,
+        # rodar de novo é seguro porque as cópias idênticas já arquivadas são mantidas
+        _copiar(destino, linhas)
+        db.session.commit()
+        db.session.execute(delete(origem).where(origem.c.id.in_([l['id'] for l in linhas])))
+        db.session.commit()
+        total += len(linhas)
+
+
+@reservas_bp.route('/reservas/arquivar', methods=['POST'])
+def arquivar_reservas():
+    """
+    Arquivar reservas antigas
+    ---
+    tags:
+      - Reservas
+    description: Move para o banco de arquivo, em lotes, as reservas com data anterior a antes_de. Reservas arquivadas só aparecem nas consultas com ?arquivo=true.
+    parameters:
+      - name: body
+        in: body
+        required: true
+        schema:
+          type: object
+          required:
+            - antes_de
+          properties:
+            antes_de:
+              type: string
+              format: date
+              example: "2025-01-01"
+            tamanho_lote:
+              type: integer
+              example: 1000
+    responses:
+      200:
+        description: Quantidade de reservas arquivadas
+      400:
+        description: Data ou tamanho de lote inválido
+      409:
+        description: Já existe no arquivo uma reserva com o mesmo id e outro conteúdo
+    """
+    data = request.get_json(silent=True) or {}
+    try:
+        antes_de = datetime.strptime(data.get('antes_de') or '', '%Y-%m-%d').date()
+    except ValueError:
+        return jsonify({'erro': 'Formato de data inválido. Use YYYY-MM-DD.'}), 400
+    tamanho_lote = data.get('tamanho_lote', ARQUIVO_LOTE)
+    if not isinstance(tamanho_lote, int) or tamanho_lote <= 0:
+        return jsonify({'erro': 'tamanho_lote deve ser um inteiro positivo'}), 400
+    try:
+        return jsonify({'arquivadas': arquivar(antes_de, tamanho_lote)})
+    except ColisaoArquivo as e:
+        return jsonify({'erro': str(e)}), 409
+
+
+def registrar_comando(app):
+    @app.cli.command('arquivar')
+    @click.argument('antes_de', type=click.DateTime(formats=['%Y-%m-%d']))
+    @click.option('--lote', default=ARQUIVO_LOTE, show_default=True, help='Reservas movidas por transação.')
+    def arquivar_comando(antes_de, lote):
+        """Move as reservas anteriores a ANTES_DE (YYYY-MM-DD) para o banco de arquivo."""
+        try:
+            click.echo(f"{arquivar(antes_de.date(), lote)} reservas arquivadas")
+        except ColisaoArquivo as e:
+            raise click.ClickException(str(e))
@@ -0,0 +1,67 @@
+"""Geração de dados sintéticos para testes de escala.
+
+As reservas apontam para as turmas `1..turmas`, as mesmas criadas por `flask gerar-dados`
+no serviço de Gerenciamento quando os tamanhos são iguais. Os dados dependem apenas de
+`--seed` e dos tamanhos; os IDs começam depois dos já usados, inclusive os arquivados, e
+por isso nunca repetem uma reserva do arquivo.
+"""
+import random
+from datetime import date, timedelta
+from itertools import islice
+
+import click
+
+from app.arquivo import ultimo_id_usado
+from app.database import db
+from app.models import Reserva, ReservaArquivada
+
+DATA_BASE = date(2024, 1, 1)
+
+
+def gerar_reservas(rnd, turmas, por_turma, primeiro_id=1):
+    reserva_id = primeiro_id - 1
+    for t in range(1, turmas + 1):
+        for _ in range(por_turma):
+            reserva_id += 1
+            lab = rnd.random() < 0.3
+            num_sala = rnd.randint(1, 20) if lab else rnd.randint(100, 450)
+            yield (reserva_id, num_sala, 1 if lab else 0, (DATA_BASE + timedelta(days=rnd.randint(0, 730))).isoformat(), t)
+
+
+def carregar(conn, sql, linhas, lote):
+    """Insere as linhas com executemany, numa transação a cada `lote` linhas."""
+    total = 0
+    while True:
+        bloco = list(islice(linhas, lote))
+        if not bloco:
+            return total
+        conn.exec_driver_sql(sql, bloco)
+        conn.commit()
+        total += len(bloco)
+
+
+def registrar_comando(app):
+    @app.cli.command('gerar-dados')
+    @click.option('--seed', default=42, show_default=True)
+    @click.option('--professores', default=100, show_default=True, help='Usado pelos outros serviços.')
+    @click.option('--turmas', default=500, show_default=True)
+    @click.option('--alunos', default=20000, show_default=True, help='Usado pelos outros serviços.')
+    @click.option('--atividades-por-turma', default=5, show_default=True, help='Usado pelo serviço de Atividades.')
+    @click.option('--reservas-por-turma', default=10, show_default=True)
+    @click.option('--lote', default=50000, show_default=True, help='Linhas por transação.')
+    @click.option('--limpar', is_flag=True, help='Apaga os dados existentes antes de gerar.')
+    def gerar_dados(seed, professores, turmas, alunos, atividades_por_turma, reservas_por_turma, lote, limpar):
+        """Gera reservas sintéticas direto no banco SQLite."""
+        with db.engine.connect() as conn:
+            existentes = conn.exec_driver_sql("SELECT COUNT(*) FROM reserva").scalar()
+            if existentes and not limpar:
+                raise click.ClickException('O banco já tem dados; use --limpar para substituí-los.')
+            conn.exec_driver_sql('PRAGMA synchronous = OFF')
+            if limpar:
+                conn.exec_driver_sql('DELETE FROM reserva')
+                conn.commit()
+            primeiro_id = ultimo_id_usado(conn, Reserva.__table__, ReservaArquivada.__table__) + 1
+
+            n = carregar(conn, 'INSERT INTO reserva (id, num_sala, lab, data, turma_id) VALUES (?, ?, ?, ?, ?)',
+                         gerar_reservas(random.Random(seed * 10 + 6), turmas, reservas_por_turma, primeiro_id), lote)
+            click.echo(f'{n} reservas')
@@ -0,0 +1,102 @@
+import hashlib
+import os
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from functools import wraps
+
+import msgpack
+from flask import jsonify, make_response, request
+
+from app.formato import MSGPACK
+
+IDEMPOTENCIA_TTL = float(os.getenv('IDEMPOTENCIA_TTL', '86400'))
+
+
+class RegistroIdempotencia:
+    """Guarda em memória as respostas de requisições com Idempotency-Key por até `ttl` segundos."""
+
+    def __init__(self, ttl):
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        # chave -> (expira_em, hash do corpo da requisição, status, conteúdo da resposta já decodificado)
+        # O conteúdo é guardado decodificado para que cada repetição o receba no formato do seu Accept
+        # Como o TTL é fixo, a ordem de inserção também é a ordem de expiração
+        self._respostas = OrderedDict()
+        self._travas = {}  # chave -> [lock, requisições usando a chave]
+
+    def _remover_expiradas(self, agora):
+        while self._respostas:
+            chave, item = next(iter(self._respostas.items()))
+            if item[0] >= agora:
+                break
+            del self._respostas[chave]
+
+    def obter(self, chave):
+        with self._lock:
+            self._remover_expiradas(time.monotonic())
+            return self._respostas.get(chave)
+
+    def guardar(self, chave, hash_corpo, resposta):
+        with self._lock:
+            agora = time.monotonic()
+            self._remover_expiradas(agora)
+            self._respostas[chave] = (agora + self.ttl, hash_corpo, resposta.status_code, _conteudo(resposta))
+
+    @contextmanager
+    def trava(self, chave):
+        """Serializa as requisições concorrentes com a mesma chave."""
+        with self._lock:
+            item = self._travas.setdefault(chave, [threading.Lock(), 0])
+            item[1] += 1
+        try:
+            with item[0]:
+                yield
+        finally:
+            with self._lock:
+                item[1] -= 1
+                if item[1] == 0:
+                    del self._travas[chave]
+
+
+def _conteudo(resposta):
+    """Decodifica a resposta gerada pelo jsonify, em JSON ou MessagePack."""
+    if resposta.mimetype == MSGPACK:
+        return msgpack.unpackb(resposta.get_data())
+    return resposta.get_json()
+
+
+registro = RegistroIdempotencia(IDEMPOTENCIA_TTL)
+
+
+def idempotente(view):
+    """Permite repetir um POST com o mesmo Idempotency-Key sem criar registros duplicados.
+
+    A primeira resposta de sucesso é guardada; as repetições recebem essa mesma resposta
+    sem passar pela validação nem pelo banco. Reusar a chave com outro corpo gera 422.
+    """
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        chave = request.headers.get('Idempotency-Key')
+        if not chave:
+            return view(*args, **kwargs)
+        chave = (request.path, chave)
+        hash_corpo = hashlib.sha256(request.get_data()).hexdigest()
+
+        with registro.trava(chave):
+            salva = registro.obter(chave)
+            if salva is not None:
+                _, hash_salvo, status, conteudo = salva
+                if hash_salvo != hash_corpo:
+                    return jsonify({'erro': 'Idempotency-Key já usada com outro corpo'}), 422
+                resp = jsonify(conteudo)
+                resp.status_code = status
+                resp.headers['Idempotent-Replayed'] = 'true'
+                return resp
+
+            resp = make_response(view(*args, **kwargs))
+            if 200 <= resp.status_code < 300:
+                registro.guardar(chave, hash_corpo, resp)
+            return resp
+    return wrapper
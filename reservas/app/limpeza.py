@@ -0,0 +1,45 @@
+"""Remoção das reservas de turmas apagadas no Gerenciamento.
+
+O Gerenciamento chama POST /limpeza/turmas/<id> ao apagar uma turma; a rota só agenda a
+tarefa e responde 202. A tarefa apaga as reservas em lotes de LIMPEZA_LOTE, pelo índice de
+turma_id, com um commit por lote.
+"""
+import os
+
+from flask import jsonify
+from sqlalchemy import delete, select
+
+from app.database import db
+from app.fila import enfileirar, tarefa
+from app.models import Reserva
+from app.routes import reservas_bp
+
+LIMPEZA_LOTE = int(os.getenv('LIMPEZA_LOTE', '1000'))
+
+
+@tarefa('limpar_turma')
+def limpar_turma(turma_id):
+    reservas = Reserva.__table__
+    while True:
+        lote = select(reservas.c.id).where(reservas.c.turma_id == turma_id).limit(LIMPEZA_LOTE)
+        apagadas = db.session.execute(delete(reservas).where(reservas.c.id.in_(lote))).rowcount
+        db.session.commit()
+        if apagadas < LIMPEZA_LOTE:
+            return
+
+
+@reservas_bp.route('/limpeza/turmas/<int:id>', methods=['POST'])
+def agendar_limpeza_turma(id):
+    """
+    Agendar a remoção das reservas de uma turma apagada
+    ---
+    tags: [Reservas]
+    description: Chamado pelo Gerenciamento ao apagar uma turma. As reservas são apagadas em segundo plano.
+    parameters:
+      - { name: id, in: path, type: integer, required: true }
+    responses:
+      202: { description: "Remoção agendada" }
+    """
+    enfileirar('limpar_turma', turma_id=id)
+    db.session.commit()
+    return jsonify({'mensagem': 'Remoção agendada'}), 202
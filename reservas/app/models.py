@@ -1,8 +1,31 @@
 from app.database import db
 
 class Reserva(db.Model):
+    # AUTOINCREMENT: IDs de registros arquivados nunca são reaproveitados
+    __table_args__ = {'sqlite_autoincrement': True}
     id = db.Column(db.Integer, primary_key=True)
     num_sala = db.Column(db.Integer, nullable=False)
     lab = db.Column(db.Boolean, default=False, nullable=False)
-    data = db.Column(db.Date, nullable=False)
-    turma_id = db.Column(db.Integer, nullable=False)
+    data = db.Column(db.Date, nullable=False, index=True)
+    turma_id = db.Column(db.Integer, nullable=False, index=True)
+
+# Reservas antigas movidas para o banco de arquivo (ver app/arquivo.py)
+class ReservaArquivada(db.Model):
+    __bind_key__ = 'arquivo'
+    __tablename__ = 'reserva_arquivada'
+    id = db.Column(db.Integer, primary_key=True)
+    num_sala = db.Column(db.Integer, nullable=False)
+    lab = db.Column(db.Boolean, default=False, nullable=False)
+    data = db.Column(db.Date, nullable=False, index=True)
+    turma_id = db.Column(db.Integer, nullable=False, index=True)
+
+# Tarefas da fila em segundo plano (ver app/fila.py)
+class Tarefa(db.Model):
+    __table_args__ = (db.Index('ix_tarefa_estado_executar_em', 'estado', 'executar_em'),)
+    id = db.Column(db.Integer, primary_key=True)
+    tipo = db.Column(db.String(50), nullable=False)
+    dados = db.Column(db.Text, nullable=False)  # argumentos em JSON
+    estado = db.Column(db.String(20), nullable=False, default='pendente')
+    tentativas = db.Column(db.Integer, nullable=False, default=0)
+    executar_em = db.Column(db.Float, nullable=False)  # time.time() a partir do qual pode rodar
+    erro = db.Column(db.Text)
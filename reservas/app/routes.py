@@ -1,12 +1,48 @@
 from flask import Blueprint, request, jsonify
-from app.models import db, Reserva
-import requests, os
+from app.models import db, Reserva, ReservaArquivada
+from app.idempotencia import idempotente
+from app.listas import responder_lista
+from app.servicos import existe_no_gerenciamento, requer_gerenciamento
+from sqlalchemy.orm import load_only
 from datetime import datetime
 
 reservas_bp = Blueprint('reservas', __name__)
-GERENCIAMENTO_URL = os.getenv('GERENCIAMENTO_URL', 'http://gerenciamento:5000')
+
+# Helper para converter a reserva em dicionário (opcionalmente só com alguns campos)
+def to_dict(reserva, campos=None):
+    if reserva is None:
+        return None
+    nomes = campos or [c.name for c in reserva.__table__.columns]
+    d = {n: getattr(reserva, n) for n in nomes}
+    if 'data' in d and d['data']:
+        d['data'] = d['data'].isoformat()
+    return d
+
+# Reservas arquivadas só são lidas quando a consulta pede ?arquivo=true
+def modelo_consultado():
+    return ReservaArquivada if request.args.get('arquivo', '').lower() in ('1', 'true', 'sim') else Reserva
+
+# Helper para ?fields=a,b: devolve (campos, erro); campos é None quando todos foram pedidos
+def campos_solicitados():
+    fields = request.args.get('fields')
+    if not fields:
+        return None, None
+    campos = [f.strip() for f in fields.split(',') if f.strip()]
+    invalidos = [c for c in campos if c not in Reserva.__table__.columns]
+    if invalidos:
+        return None, (jsonify({'erro': f"Campos inválidos: {', '.join(invalidos)}"}), 400)
+    return campos, None
+
+# Restringe o SELECT às colunas pedidas
+def com_campos(modelo, campos):
+    query = modelo.query
+    if campos:
+        query = query.options(load_only(*[getattr(modelo, c) for c in campos]))
+    return query
 
 @reservas_bp.route('/reservas', methods=['POST'])
+@idempotente
+@requer_gerenciamento
 def criar_reserva():
     """
     Criar uma nova reserva
@@ -15,6 +51,11 @@ def criar_reserva():
       - Reservas
     description: Cria uma nova reserva vinculada a uma turma existente no serviço de Gerenciamento.
     parameters:
+      - name: Idempotency-Key
+        in: header
+        type: string
+        required: false
+        description: Chave para repetir a requisição com segurança
       - name: body
         in: body
         required: true
@@ -47,6 +88,12 @@ def criar_reserva():
         description: Reserva criada com sucesso
       404:
         description: Turma não encontrada
+      422:
+        description: Idempotency-Key já usada com outro corpo
+      502:
+        description: Serviço de Gerenciamento indisponível
+      503:
+        description: Serviço de Gerenciamento sobrecarregado; repetir após o Retry-After
     """
     data = request.get_json()
     turma_id = data.get('turma_id')
@@ -62,8 +109,7 @@ def criar_reserva():
     except ValueError:
         return jsonify({'erro': 'Formato de data inválido. Use YYYY-MM-DD.'}), 400
 
-    resp = requests.get(f"{GERENCIAMENTO_URL}/turmas/{turma_id}")
-    if resp.status_code != 200:
+    if not existe_no_gerenciamento('turmas', turma_id):
         return jsonify({'erro': 'Turma não encontrada'}), 404
 
     reserva = Reserva(
@@ -75,13 +121,7 @@ def criar_reserva():
     db.session.add(reserva)
     db.session.commit()
     
-    return jsonify({
-        'id': reserva.id,
-        'turma_id': reserva.turma_id,
-        'num_sala': reserva.num_sala,
-        'lab': reserva.lab,
-        'data': reserva.data.isoformat()
-    }), 201
+    return jsonify(to_dict(reserva)), 201
 
 @reservas_bp.route('/reservas', methods=['GET'])
 def listar_reservas():
@@ -91,20 +131,49 @@ def listar_reservas():
     tags:
       - Reservas
     description: Retorna uma lista de todas as reservas cadastradas.
+    parameters:
+      - name: turma_id
+        in: query
+        type: integer
+        required: false
+        description: Filtrar pelas reservas de uma turma
+      - name: data
+        in: query
+        type: string
+        format: date
+        required: false
+        description: Filtrar pelas reservas de uma data (YYYY-MM-DD)
+      - name: fields
+        in: query
+        type: string
+        required: false
+        description: Campos a retornar, separados por vírgula
+      - name: arquivo
+        in: query
+        type: boolean
+        required: false
+        description: Consultar as reservas arquivadas
     responses:
       200:
         description: Lista de reservas
+      400:
+        description: Formato de data ou campos inválidos
     """
-    reservas = Reserva.query.all()
-    return jsonify([
-        {
-            'id': r.id,
-            'turma_id': r.turma_id,
-            'num_sala': r.num_sala,
-            'lab': r.lab,
-            'data': r.data.isoformat()
-        } for r in reservas
-    ])
+    campos, erro = campos_solicitados()
+    if erro:
+        return erro
+    modelo = modelo_consultado()
+    query = com_campos(modelo, campos)
+    turma_id = request.args.get('turma_id', type=int)
+    if turma_id is not None:
+        query = query.filter_by(turma_id=turma_id)
+    if 'data' in request.args:
+        try:
+            data_reserva = datetime.strptime(request.args['data'], '%Y-%m-%d').date()
+        except ValueError:
+            return jsonify({'erro': 'Formato de data inválido. Use YYYY-MM-DD.'}), 400
+        query = query.filter_by(data=data_reserva)
+    return responder_lista(query, modelo.id, lambda r: to_dict(r, campos))
 
 @reservas_bp.route('/reservas/<int:id>', methods=['GET'])
 def obter_reserva(id):
@@ -119,24 +188,34 @@ def obter_reserva(id):
         type: integer
         required: true
         description: ID da reserva
+      - name: fields
+        in: query
+        type: string
+        required: false
+        description: Campos a retornar, separados por vírgula
+      - name: arquivo
+        in: query
+        type: boolean
+        required: false
+        description: Consultar as reservas arquivadas
     responses:
       200:
         description: Dados da reserva
+      400:
+        description: Campos inválidos
       404:
         description: Reserva não encontrada
     """
-    reserva = Reserva.query.get(id)
+    campos, erro = campos_solicitados()
+    if erro:
+        return erro
+    reserva = com_campos(modelo_consultado(), campos).get(id)
     if not reserva:
         return jsonify({'erro': 'Reserva não encontrada'}), 404
-    return jsonify({
-        'id': reserva.id,
-        'turma_id': reserva.turma_id,
-        'num_sala': reserva.num_sala,
-        'lab': reserva.lab,
-        'data': reserva.data.isoformat()
-    })
+    return jsonify(to_dict(reserva, campos))
 
 @reservas_bp.route('/reservas/<int:id>', methods=['PUT'])
+@requer_gerenciamento
 def atualizar_reserva(id):
     """
     Atualizar uma reserva
@@ -169,6 +248,10 @@ def atualizar_reserva(id):
         description: Reserva atualizada
       404:
         description: Reserva ou Turma não encontrada
+      502:
+        description: Serviço de Gerenciamento indisponível
+      503:
+        description: Serviço de Gerenciamento sobrecarregado; repetir após o Retry-After
     """
     reserva = Reserva.query.get(id)
     if not reserva:
@@ -177,8 +260,7 @@ def atualizar_reserva(id):
     data = request.get_json()
     turma_id = data.get('turma_id')
     if turma_id:
-        resp = requests.get(f"{GERENCIAMENTO_URL}/turmas/{turma_id}")
-        if resp.status_code != 200:
+        if not existe_no_gerenciamento('turmas', turma_id):
             return jsonify({'erro': 'Turma não encontrada'}), 404
         reserva.turma_id = turma_id
 
@@ -192,13 +274,7 @@ def atualizar_reserva(id):
             return jsonify({'erro': 'Formato de data inválido. Use YYYY-MM-DD.'}), 400
 
     db.session.commit()
-    return jsonify({
-        'id': reserva.id,
-        'turma_id': reserva.turma_id,
-        'num_sala': reserva.num_sala,
-        'lab': reserva.lab,
-        'data': reserva.data.isoformat()
-    })
+    return jsonify(to_dict(reserva))
 
 @reservas_bp.route('/reservas/<int:id>', methods=['DELETE'])
 def deletar_reserva(id):
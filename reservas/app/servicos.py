@@ -0,0 +1,63 @@
+import os
+from functools import wraps
+
+import requests
+from flask import jsonify
+from requests.adapters import HTTPAdapter
+from app.database import db
+from app.formato import ACCEPT_INTERNO
+from app.rastreamento import SessaoRastreada
+
+GERENCIAMENTO_URL = os.getenv('GERENCIAMENTO_URL', 'http://gerenciamento:5000')
+TIMEOUT = float(os.getenv('SERVICOS_TIMEOUT', '5'))
+
+# Sessão compartilhada: reaproveita conexões TCP (keep-alive) com o Gerenciamento
+# e propaga o traceparent em cada chamada; toda chamada tem no máximo TIMEOUT segundos
+sessao = SessaoRastreada(timeout=TIMEOUT)
+sessao.headers['Accept'] = ACCEPT_INTERNO  # prefere MessagePack, aceita JSON
+_adapter = HTTPAdapter(pool_connections=1, pool_maxsize=int(os.getenv('SERVICOS_POOL', '16')))
+sessao.mount('http://', _adapter)
+sessao.mount('https://', _adapter)
+
+
+class GerenciamentoIndisponivel(Exception):
+    """O Gerenciamento respondeu a uma validação com erro (ex.: 503 por sobrecarga)."""
+
+    def __init__(self, resp):
+        super().__init__(resp.status_code)
+        self.status_code = resp.status_code
+        self.retry_after = resp.headers.get('Retry-After')
+
+
+def existe_no_gerenciamento(recurso, id):
+    """Consulta /<recurso>/<id>: só o 404 conta como inexistente; outros erros levantam GerenciamentoIndisponivel."""
+    resp = sessao.get(f"{GERENCIAMENTO_URL}/{recurso}/{id}")
+    if resp.status_code == 200:
+        return True
+    if resp.status_code == 404:
+        return False
+    raise GerenciamentoIndisponivel(resp)
+
+
+def requer_gerenciamento(view):
+    """Responde 502/503 quando o Gerenciamento não consegue atender uma validação, em vez de erro 500."""
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        try:
+            return view(*args, **kwargs)
+        except GerenciamentoIndisponivel as e:
+            db.session.rollback()
+            if e.status_code == 503:
+                # Sobrecarga passageira: o cliente pode repetir depois do Retry-After
+                resp = jsonify({'erro': 'Serviço de Gerenciamento sobrecarregado, tente novamente em instantes'})
+                resp.status_code = 503
+                resp.headers['Retry-After'] = e.retry_after or '1'
+                return resp
+            return jsonify({'erro': f'Serviço de Gerenciamento respondeu com erro {e.status_code}'}), 502
+        except requests.Timeout:
+            db.session.rollback()
+            return jsonify({'erro': 'Serviço de Gerenciamento não respondeu a tempo'}), 502
+        except requests.RequestException:
+            db.session.rollback()
+            return jsonify({'erro': 'Serviço de Gerenciamento indisponível'}), 502
+    return wrapper